@@ -0,0 +1,83 @@
+# benchmarks/bench_commit_reader.py
+"""
+Compare the streaming git log commit reader with the pydriller traversal it replaced.
+
+Builds a synthetic repository with `git fast-import` and times both readers on it:
+
+    python benchmarks/bench_commit_reader.py --commits 10000
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.local_history import iter_commit_metadata
+
+def build_synthetic_repo(repo_path: str, num_commits: int, num_files: int = 500, seed: int = 42):
+    """
+    Create a repo with `num_commits` linear commits, each touching 1-3 of `num_files` files.
+    """
+    rng = random.Random(seed)
+    subprocess.run(["git", "init", "-q", repo_path], check=True)
+    contents = {}
+    stream = []
+    for i in range(num_commits):
+        timestamp = 1600000000 + i * 60
+        message = f"Commit {i}: update module\n"
+        stream.append(f"commit refs/heads/main\nmark :{i + 1}\n")
+        stream.append(f"author Dev {i % 25} <dev{i % 25}@example.com> {timestamp} +0000\n")
+        stream.append(f"committer Dev {i % 25} <dev{i % 25}@example.com> {timestamp} +0000\n")
+        stream.append(f"data {len(message.encode())}\n{message}")
+        if i > 0:
+            stream.append(f"from :{i}\n")
+        for _ in range(rng.randint(1, 3)):
+            name = f"src/pkg{rng.randrange(20)}/module_{rng.randrange(num_files)}.py"
+            contents[name] = contents.get(name, "") + f"value_{i} = {rng.random()}\n"
+            data = contents[name].encode()
+            stream.append(f"M 100644 inline {name}\ndata {len(data)}\n")
+            stream.append(data.decode() + "\n")
+    subprocess.run(["git", "-C", repo_path, "fast-import", "--quiet"], input="".join(stream).encode(), check=True)
+    subprocess.run(["git", "-C", repo_path, "symbolic-ref", "HEAD", "refs/heads/main"], check=True)
+    subprocess.run(["git", "-C", repo_path, "reset", "-q", "--hard"], check=True)
+
+def time_git_log_reader(repo_path: str):
+    start = time.perf_counter()
+    count = sum(1 for _ in iter_commit_metadata(repo_path))
+    return count, time.perf_counter() - start
+
+def time_pydriller_reader(repo_path: str):
+    from pydriller import Repository
+
+    start = time.perf_counter()
+    count = 0
+    for commit in Repository(repo_path).traverse_commits():
+        [modified_file.filename for modified_file in commit.modified_files]
+        count += 1
+    return count, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--commits", type=int, default=10000, help="Number of synthetic commits")
+    parser.add_argument("--skip-pydriller", action="store_true", help="Only time the git log reader")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        repo_path = os.path.join(tmp, "synthetic")
+        print(f"Building synthetic repo with {args.commits} commits...")
+        build_synthetic_repo(repo_path, args.commits)
+
+        count, elapsed = time_git_log_reader(repo_path)
+        print(f"git log reader: {count} commits in {elapsed:.2f}s")
+
+        if not args.skip_pydriller:
+            baseline_count, baseline_elapsed = time_pydriller_reader(repo_path)
+            print(f"pydriller:      {baseline_count} commits in {baseline_elapsed:.2f}s")
+            print(f"speedup:        {baseline_elapsed / elapsed:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,27 @@
 # main.py
 from fastapi import FastAPI, Query
 from fastapi.middleware.cors import CORSMiddleware
-from services.git_cloner import clone_repo
+from fastapi.responses import StreamingResponse
+from services.git_cloner import clone_repo, get_head_sha, get_remote_head_sha
+from services.clone_store import get_clone_store
 from services.commit_parser import get_commit_summary
 from services.module_parser import get_directory_tree, detect_modules
 from services.code_extractor import extract_python_symbols
-from services.summarizer import summarize_symbol
-from services.diff_parser import build_file_evolution, get_file_lifecycle_stats, extract_repo_owner_name
+from services.symbol_index import build_symbol_index, file_symbols
+from services.search_index import build_search_index
+from services.summarizer import summarize_symbols, summary_cache
+from services.diff_parser import build_file_evolution, extract_repo_owner_name, response_cache
 from services.project_analyzer import extract_project_summary, generate_project_summary_text
 from services.file_analyzer import analyze_file_role
 from services.dependency_analyzer import build_dependency_graph, generate_mermaid_diagram
+from services.local_history import get_path_history, is_partial_clone
+from services.change_store import ChangeStore, CHURN_WINDOWS, build_change_store_local
+from services.hunk_index import get_line_history
+from services.analysis_cache import analysis_cache
+from services.jobs import job_manager
+from services.file_index import build_file_index
+from services.blob_cache import blob_cache, get_blob_shas
+import json
 import os
 
 app = FastAPI()
@@ -23,120 +35,309 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def cached_stage(url: str, head_sha: str, stage: str, compute, **params):
+    """
+    Serve an analysis stage from the shared cache, computing it only when the repo HEAD moved.
+    """
+    return analysis_cache.get_or_compute(url, head_sha, stage, compute, params)
+
+def cached_commits(url: str, head_sha: str, path: str):
+    """
+    Serve the commit summary, keyed by whether the clone could detect renames (blobless
+    clones cannot), so endpoints cloning at different history levels don't share results.
+    """
+    return cached_stage(url, head_sha, "commits", lambda: get_commit_summary(path),
+                        renames=not is_partial_clone(path))
+
 @app.get("/")
 def hello():
     return {"message": "CodeLore backend live"}
 
+@app.get("/api/cache/stats")
+def get_cache_stats():
+    """
+    Hit/miss counters and size of the analysis, GitHub response, blob and summary caches.
+    """
+    return {
+        "analysis": analysis_cache.stats(),
+        "github_responses": response_cache.stats(),
+        "blobs": blob_cache.stats(),
+        "summaries": summary_cache.stats()
+    }
+
+@app.get("/api/clone-store/stats")
+def get_clone_store_stats():
+    """
+    Disk usage, byte budget and last access of every clone in the clone store.
+    """
+    return get_clone_store().stats()
+
+# Pipeline stages reported by the dashboard pipeline, in order
+DASHBOARD_STAGES = ["clone", "project_summary", "dependencies", "evolution", "file_roles", "commits"]
+
+# File objects per streamed "files" chunk
+DASHBOARD_FILE_CHUNK = int(os.getenv("CODELORE_STREAM_FILE_CHUNK", "50"))
+
+def iter_dashboard_sections(url: str, progress=None, chunk_size: int = DASHBOARD_FILE_CHUNK, revision: str = None):
+    """
+    Run the dashboard pipeline and yield each section as soon as it is computed.
+
+    Yields (section, data) pairs: "summary" (text) right after the project summary,
+    "architecture" (Mermaid diagram) after the dependency graph, "files" chunks of up to
+    `chunk_size` file objects as their roles are analyzed, and finally "stats". The commit
+    summary only feeds the stats, so it is read after the last file chunk went out.
+
+    Args:
+        url (str): GitHub repo URL
+        progress (callable, optional): Called with each stage name from DASHBOARD_STAGES as it starts
+        chunk_size (int): File objects per "files" chunk
+        revision (str, optional): Commit to analyze; the clone is reset to it first
+    """
+    report = progress or (lambda stage: None)
+
+    # Clone repo and get basic data
+    report("clone")
+    path = clone_repo(url, history="full", revision=revision)
+    head_sha = get_head_sha(path)
+    file_index = cached_stage(url, head_sha, "file_index", lambda: build_file_index(path))
+    blob_shas = cached_stage(url, head_sha, "blob_shas", lambda: get_blob_shas(path))
+    
+    # Get project summary
+    report("project_summary")
+    summary_data = cached_stage(url, head_sha, "project_summary", lambda: extract_project_summary(path, file_index))
+    yield "summary", generate_project_summary_text(summary_data)
+    
+    # Get dependency graph and architecture
+    report("dependencies")
+    connections = cached_stage(url, head_sha, "dependencies", lambda: build_dependency_graph(path, file_index, blob_shas=blob_shas))
+    yield "architecture", cached_stage(url, head_sha, "mermaid", lambda: generate_mermaid_diagram(connections))
+    
+    # Get file evolution for commit history
+    report("evolution")
+    changes = cached_stage(url, head_sha, "changes", lambda: build_change_store_local(path), source="local")
+    
+    # Build comprehensive file data
+    report("file_roles")
+    files = []
+    total_files = 0
+    for file_path in connections["dependencies"].keys():
+        full_path = os.path.join(path, file_path)
+        if os.path.exists(full_path):
+            # Get file role
+            file_history = changes.file_history(file_path)
+            role_data = analyze_file_role(full_path, file_history, blob_shas.get(file_path))
+            
+            # Get file connections
+            file_connections = []
+            if file_path in connections["dependencies"]:
+                for dep in connections["dependencies"][file_path]:
+                    if dep in connections["file_map"]:
+                        file_connections.append(connections["file_map"][dep]["name"])
+            
+            # Format commit history
+            formatted_history = []
+            for commit in file_history[:10]:  # Limit to 10 most recent
+                formatted_history.append({
+                    "hash": commit.get("hash", ""),
+                    "date": commit.get("date", ""),
+                    "message": commit.get("message", ""),
+                    "changes": commit.get("changes", "")
+                })
+            
+            # Create file object
+            file_obj = {
+                "name": os.path.basename(file_path),
+                "path": file_path,
+                "role": role_data.get("role", "Unknown"),
+                "connections": file_connections,
+                "commitHistory": formatted_history,
+                "summary": role_data.get("summary", "No summary available")
+            }
+            files.append(file_obj)
+            total_files += 1
+            if len(files) >= chunk_size:
+                yield "files", files
+                files = []
+    if files:
+        yield "files", files
+    
+    report("commits")
+    commits = cached_commits(url, head_sha, path)
+    
+    yield "stats", {
+        "total_files": total_files,
+        "total_commits": len(commits),
+        "total_connections": len(connections["imports"])
+    }
+
+def build_dashboard(url: str, progress=None, revision: str = None) -> dict:
+    """
+    Run the dashboard pipeline for a repo and assemble the full payload.
+
+    Args:
+        url (str): GitHub repo URL
+        progress (callable, optional): Called with each stage name from DASHBOARD_STAGES as it starts
+        revision (str, optional): Commit to analyze; the clone is reset to it first
+
+    Returns:
+        dict: The dashboard payload
+    """
+    dashboard = {"summary": None, "files": [], "architecture": None, "stats": None}
+    for section, data in iter_dashboard_sections(url, progress, revision=revision):
+        if section == "files":
+            dashboard["files"].extend(data)
+        else:
+            dashboard[section] = data
+    return dashboard
+
 @app.get("/api/project/summary")
 def get_dashboard_data(url: str = Query(..., description="GitHub repo URL")):
     """
     Unified endpoint that provides all data needed for the dashboard.
     Returns project summary, file roles, commit history, and architecture diagram.
+    For large repos, submit a background job with POST /api/jobs instead.
     """
     try:
-        # Clone repo and get basic data
-        path = clone_repo(url)
-        commits = get_commit_summary(path)
-        owner, repo = extract_repo_owner_name(url)
-        
-        # Get project summary
-        summary_data = extract_project_summary(path)
-        summary_text = generate_project_summary_text(summary_data)
-        
-        # Get dependency graph and architecture
-        connections = build_dependency_graph(path)
-        mermaid_diagram = generate_mermaid_diagram(connections)
-        
-        # Get file evolution for commit history
-        file_evolution = build_file_evolution(owner, repo, commits[:30], None)  # Limit for performance
-        
-        # Build comprehensive file data
-        files = []
-        for file_path in connections["dependencies"].keys():
-            full_path = os.path.join(path, file_path)
-            if os.path.exists(full_path):
-                # Get file role
-                file_history = file_evolution.get(file_path, [])
-                role_data = analyze_file_role(full_path, file_history)
-                
-                # Get file connections
-                file_connections = []
-                if file_path in connections["dependencies"]:
-                    for dep in connections["dependencies"][file_path]:
-                        if dep in connections["file_map"]:
-                            file_connections.append(connections["file_map"][dep]["name"])
-                
-                # Format commit history
-                formatted_history = []
-                for commit in file_history[:10]:  # Limit to 10 most recent
-                    formatted_history.append({
-                        "hash": commit.get("hash", ""),
-                        "date": commit.get("date", ""),
-                        "message": commit.get("message", ""),
-                        "changes": commit.get("changes", "")
-                    })
-                
-                # Create file object
-                file_obj = {
-                    "name": os.path.basename(file_path),
-                    "path": file_path,
-                    "role": role_data.get("role", "Unknown"),
-                    "connections": file_connections,
-                    "commitHistory": formatted_history,
-                    "summary": role_data.get("summary", "No summary available")
-                }
-                files.append(file_obj)
-        
-        return {
-            "summary": summary_text,
-            "files": files,
-            "architecture": mermaid_diagram,
-            "stats": {
-                "total_files": len(files),
-                "total_commits": len(commits),
-                "total_connections": len(connections["imports"])
-            }
-        }
+        return build_dashboard(url)
     except Exception as e:
         return {"error": str(e)}
 
+@app.get("/api/project/summary/stream")
+def stream_dashboard_data(url: str = Query(..., description="GitHub repo URL")):
+    """
+    Streaming variant of /api/project/summary as NDJSON, one section per line:
+    {"type": "summary" | "architecture" | "files" | "stats", "data": ...}, then {"type": "done"}.
+    File objects arrive in chunks as they are analyzed; a failure ends the stream with
+    {"type": "error", "error": ...}.
+    """
+    def lines():
+        try:
+            for section, data in iter_dashboard_sections(url):
+                yield json.dumps({"type": section, "data": data}) + "\n"
+            yield json.dumps({"type": "done"}) + "\n"
+        except Exception as e:
+            yield json.dumps({"type": "error", "error": str(e)}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.post("/api/jobs")
+def submit_job(url: str = Query(..., description="GitHub repo URL")):
+    """
+    Queue a background dashboard analysis and return its job id.
+    Submitting the same repo at the same commit again joins the existing job.
+    """
+    try:
+        sha = get_remote_head_sha(url)
+        # Pin the analysis to the commit the job is keyed by; a clone that has not been
+        # refreshed yet could otherwise still be at an older HEAD
+        job = job_manager.submit(url, sha, lambda url, progress: build_dashboard(url, progress, revision=sha),
+                                 DASHBOARD_STAGES)
+        return job.to_dict()
+    except Exception as e:
+        return {"error": str(e)}
+
+@app.get("/api/jobs/{job_id}")
+def get_job(job_id: str):
+    """
+    Status and per-stage progress of a background job.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        return {"error": "Job not found"}
+    return job.to_dict()
+
+@app.get("/api/jobs/{job_id}/result")
+def get_job_result(job_id: str):
+    """
+    Dashboard payload of a completed job.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        return {"error": "Job not found"}
+    outcome = job.outcome()
+    if outcome["status"] == "failed":
+        return {"error": outcome["error"]}
+    if outcome["status"] != "completed":
+        return {"error": f"Job is {outcome['status']}", "status": outcome["status"], "stage": outcome["stage"]}
+    return outcome["result"]
+
 @app.get("/analyze")
 def analyze_repo(url: str = Query(..., description="GitHub repo URL")):
     try:
-        path = clone_repo(url)
-        commits = get_commit_summary(path)
-        file_tree = get_directory_tree(path)
+        path = clone_repo(url, history="commits")
+        head_sha = get_head_sha(path)
+        file_index = cached_stage(url, head_sha, "file_index", lambda: build_file_index(path))
+        commits = cached_commits(url, head_sha, path)
+        file_tree = cached_stage(url, head_sha, "directory_tree", lambda: get_directory_tree(path, file_index=file_index))
         modules = detect_modules(file_tree)
         return {
             "repo": url,
-            "commits": commits[:10],
+            "commits": [commit.to_dict() for commit in commits[:10]],
             "modules": modules,
             "files": file_tree[:20]  # Preview top 20
         }
     except Exception as e:
         return {"error": str(e)}
 
+def get_file_symbols(url: str, path: str, head_sha: str, file: str):
+    """
+    Look a file's symbols up in the repo-wide symbol index, parsing it directly only
+    when the index does not cover it (e.g. a Python script without a .py extension).
+    """
+    file_index = cached_stage(url, head_sha, "file_index", lambda: build_file_index(path))
+    blob_shas = cached_stage(url, head_sha, "blob_shas", lambda: get_blob_shas(path))
+    symbol_index = cached_stage(url, head_sha, "symbol_index",
+                                lambda: build_symbol_index(path, file_index, blob_shas))
+    symbols = file_symbols(symbol_index, file)
+    if symbols is None:
+        symbols = extract_python_symbols(os.path.join(path, file), blob_shas.get(file))
+    return symbols
+
 @app.get("/symbols")
 def extract_code(url: str, file: str):
     try:
-        path = clone_repo(url)
+        path = clone_repo(url, history="head")
+        head_sha = get_head_sha(path)
         full_path = os.path.join(path, file)
         if not os.path.isfile(full_path):
             return {"error": "File not found"}
-        symbols = extract_python_symbols(full_path)
+        symbols = get_file_symbols(url, path, head_sha, file)
         return {"file": file, "symbols": symbols}
     except Exception as e:
         return {"error": str(e)}
 
+@app.get("/api/search")
+def search_repo(url: str = Query(..., description="GitHub repo URL"),
+                q: str = Query("", description="Search text"),
+                mode: str = Query("auto", description="'prefix', 'substring' or 'auto'"),
+                kind: str = Query(None, description="Only 'file' or 'symbol' results"),
+                role: str = Query(None, description="Only files (and their symbols) whose role or category contains this text"),
+                page: int = Query(1, ge=1),
+                page_size: int = Query(20, ge=1, le=100)):
+    """
+    Search file paths, file roles and symbol names without downloading the whole dashboard payload.
+    """
+    try:
+        path = clone_repo(url, history="head")
+        head_sha = get_head_sha(path)
+        file_index = cached_stage(url, head_sha, "file_index", lambda: build_file_index(path))
+        blob_shas = cached_stage(url, head_sha, "blob_shas", lambda: get_blob_shas(path))
+        symbol_index = cached_stage(url, head_sha, "symbol_index",
+                                    lambda: build_symbol_index(path, file_index, blob_shas))
+        search_index = cached_stage(url, head_sha, "search_index",
+                                    lambda: build_search_index(file_index, symbol_index))
+        return search_index.search(q, mode=mode, kind=kind, role=role, page=page, page_size=page_size)
+    except Exception as e:
+        return {"error": str(e)}
+
 @app.get("/summarize")
 def summarize_code(url: str, file: str):
     try:
-        path = clone_repo(url)
-        full_path = os.path.join(path, file)
-        symbols = extract_python_symbols(full_path)
+        path = clone_repo(url, history="head")
+        head_sha = get_head_sha(path)
+        symbols = get_file_symbols(url, path, head_sha, file)
         summaries = []
-        for symbol in symbols:
-            summary = summarize_symbol(symbol)
+        for symbol, summary in zip(symbols, summarize_symbols(symbols)):
             summaries.append({
                 "name": symbol["name"],
                 "type": symbol["type"],
@@ -148,31 +349,39 @@ def summarize_code(url: str, file: str):
 
 @app.get("/evolution")
 def get_file_evolution(url: str = Query(..., description="GitHub repo URL"), 
-                      github_token: str = Query(None, description="GitHub API token (optional)")):
+                      github_token: str = Query(None, description="GitHub API token (optional)"),
+                      source: str = Query("local", description="Where diffs come from: 'local' clone or 'github' API")):
     """
     Get detailed file evolution tracking for a repository.
     Shows how each file has changed over time with commit-level details.
     """
     try:
-        # Clone repo and get commit history
-        path = clone_repo(url)
-        commits = get_commit_summary(path)
+        # Clone repo
+        path = clone_repo(url, history="commits" if source == "github" else "full")
+        head_sha = get_head_sha(path)
         
         # Extract owner and repo name from URL
         owner, repo = extract_repo_owner_name(url)
         
         # Build file evolution map
-        file_evolution = build_file_evolution(owner, repo, commits[:50], github_token)  # Limit to 50 commits for performance
+        if source == "github":
+            commits = cached_commits(url, head_sha, path)
+            changes = cached_stage(url, head_sha, "changes",
+                                   lambda: ChangeStore.from_evolution(
+                                       build_file_evolution(owner, repo, commits[:50], github_token)),  # Limit to 50 commits for performance
+                                   source="github", limit=50)
+        else:
+            changes = cached_stage(url, head_sha, "changes", lambda: build_change_store_local(path), source="local")
         
         # Calculate lifecycle statistics
-        lifecycle_stats = get_file_lifecycle_stats(file_evolution)
+        lifecycle_stats = cached_stage(url, head_sha, "lifecycle_stats", changes.lifecycle_stats, source=source)
         
         return {
             "repo": url,
             "owner": owner,
             "repo_name": repo,
-            "total_files_tracked": len(file_evolution),
-            "file_evolution": file_evolution,
+            "total_files_tracked": len(changes.files.values),
+            "file_evolution": changes.to_evolution(),
             "lifecycle_stats": lifecycle_stats
         }
     except Exception as e:
@@ -181,24 +390,41 @@ def get_file_evolution(url: str = Query(..., description="GitHub repo URL"),
 @app.get("/file-history")
 def get_file_history(url: str = Query(..., description="GitHub repo URL"),
                     filename: str = Query(..., description="File path to track"),
-                    github_token: str = Query(None, description="GitHub API token (optional)")):
+                    github_token: str = Query(None, description="GitHub API token (optional)"),
+                    source: str = Query("local", description="Where diffs come from: 'local' clone or 'github' API")):
     """
     Get detailed evolution history for a specific file.
-    Shows all changes made to the file over time.
+    Shows all changes made to the file over time, following renames. Only the commits
+    that touched the file are read (and, with source=github, fetched from the API).
     """
     try:
-        # Clone repo and get commit history
-        path = clone_repo(url)
-        commits = get_commit_summary(path)
-        
-        # Extract owner and repo name from URL
-        owner, repo = extract_repo_owner_name(url)
-        
-        # Build file evolution map
-        file_evolution = build_file_evolution(owner, repo, commits, github_token)
+        # Following renames diffs file contents, so even source=github needs every blob
+        path = clone_repo(url, history="full")
+        head_sha = get_head_sha(path)
         
-        # Get history for specific file
-        file_history = file_evolution.get(filename, [])
+        if source == "github":
+            # Extract owner and repo name from URL
+            owner, repo = extract_repo_owner_name(url)
+            
+            def github_history():
+                # The local commit graph says which commits touched the file and under which name
+                local_history = get_path_history(path, filename)
+                names = {entry["commit_sha"]: entry["filename"] for entry in local_history}
+                commits = cached_commits(url, head_sha, path)
+                touching = [commit for commit in commits if commit.hash in names]
+                file_evolution = build_file_evolution(owner, repo, touching, github_token)
+                return [
+                    dict(entry.to_dict(), filename=names[commit.hash])
+                    for commit in touching
+                    for entry in file_evolution.get(names[commit.hash], [])
+                    if entry.commit is commit
+                ]
+            
+            file_history = cached_stage(url, head_sha, "file_history", github_history,
+                                        source="github", path=filename)
+        else:
+            file_history = cached_stage(url, head_sha, "file_history", lambda: get_path_history(path, filename),
+                                        source="local", path=filename)
         
         return {
             "repo": url,
@@ -209,14 +435,67 @@ def get_file_history(url: str = Query(..., description="GitHub repo URL"),
     except Exception as e:
         return {"error": str(e)}
 
+@app.get("/api/line-history")
+def get_line_range_history(url: str = Query(..., description="GitHub repo URL"),
+                           path: str = Query(..., description="File path at HEAD"),
+                           start: int = Query(..., ge=1, description="First line of the range"),
+                           end: int = Query(..., ge=1, description="Last line of the range")):
+    """
+    List the commits that touched lines start..end of a file, newest first, following renames.
+    Backed by a per-file hunk index that is built on first use and extended as commits arrive.
+    """
+    try:
+        repo_path = clone_repo(url, history="full")
+        head_sha = get_head_sha(repo_path)
+        history = cached_stage(url, head_sha, "line_history", lambda: get_line_history(repo_path, path, start, end),
+                               path=path, start=start, end=end)
+        return {
+            "repo": url,
+            "path": path,
+            "start": start,
+            "end": end,
+            "total_commits": len(history),
+            "history": history
+        }
+    except Exception as e:
+        return {"error": str(e)}
+
+@app.get("/api/change-stats")
+def get_change_stats(url: str = Query(..., description="GitHub repo URL"),
+                     window: str = Query("week", description="Churn window: 'day', 'week' or 'month'")):
+    """
+    Get code churn per time window and per-author totals over the full history.
+    """
+    try:
+        if window not in CHURN_WINDOWS:
+            raise ValueError(f"Unknown churn window: {window}")
+        path = clone_repo(url, history="full")
+        head_sha = get_head_sha(path)
+        changes = cached_stage(url, head_sha, "changes", lambda: build_change_store_local(path), source="local")
+        churn = cached_stage(url, head_sha, "churn", lambda: changes.churn(window), window=window)
+        authors = cached_stage(url, head_sha, "author_totals", changes.author_totals)
+
+        return {
+            "repo": url,
+            "window": window,
+            "total_commits": len(changes.commit_shas),
+            "total_changes": len(changes),
+            "churn": churn,
+            "authors": authors
+        }
+    except Exception as e:
+        return {"error": str(e)}
+
 @app.get("/project-summary")
 def get_project_summary(url: str = Query(..., description="GitHub repo URL")):
     """
     Get an intelligent project summary including description, type, and key features.
     """
     try:
-        path = clone_repo(url)
-        summary_data = extract_project_summary(path)
+        path = clone_repo(url, history="head")
+        head_sha = get_head_sha(path)
+        file_index = cached_stage(url, head_sha, "file_index", lambda: build_file_index(path))
+        summary_data = cached_stage(url, head_sha, "project_summary", lambda: extract_project_summary(path, file_index))
         summary_text = generate_project_summary_text(summary_data)
         
         return {
@@ -233,22 +512,26 @@ def get_file_roles(url: str = Query(..., description="GitHub repo URL")):
     Get role and purpose analysis for all files in the repository.
     """
     try:
-        path = clone_repo(url)
+        path = clone_repo(url, history="full")
+        head_sha = get_head_sha(path)
+        blob_shas = cached_stage(url, head_sha, "blob_shas", lambda: get_blob_shas(path))
         
         # Get file evolution data to include commit history
-        commits = get_commit_summary(path)
-        owner, repo = extract_repo_owner_name(url)
-        file_evolution = build_file_evolution(owner, repo, commits[:20], None)  # Limit commits for performance
+        changes = cached_stage(url, head_sha, "changes", lambda: build_change_store_local(path), source="local")
         
-        file_roles = {}
+        def analyze_roles():
+            file_roles = {}
+            
+            # Analyze each file
+            for file_path in changes.files.values:
+                full_path = os.path.join(path, file_path)
+                if os.path.exists(full_path):
+                    file_history = changes.file_history(file_path)
+                    role_data = analyze_file_role(full_path, file_history, blob_shas.get(file_path))
+                    file_roles[file_path] = role_data
+            return file_roles
         
-        # Analyze each file
-        for file_path in file_evolution.keys():
-            full_path = os.path.join(path, file_path)
-            if os.path.exists(full_path):
-                file_history = file_evolution.get(file_path, [])
-                role_data = analyze_file_role(full_path, file_history)
-                file_roles[file_path] = role_data
+        file_roles = cached_stage(url, head_sha, "file_roles", analyze_roles)
         
         return {
             "repo": url,
@@ -264,9 +547,12 @@ def get_dependency_graph(url: str = Query(..., description="GitHub repo URL")):
     Get dependency graph and file connections for the repository.
     """
     try:
-        path = clone_repo(url)
-        connections = build_dependency_graph(path)
-        mermaid_diagram = generate_mermaid_diagram(connections)
+        path = clone_repo(url, history="head")
+        head_sha = get_head_sha(path)
+        file_index = cached_stage(url, head_sha, "file_index", lambda: build_file_index(path))
+        blob_shas = cached_stage(url, head_sha, "blob_shas", lambda: get_blob_shas(path))
+        connections = cached_stage(url, head_sha, "dependencies", lambda: build_dependency_graph(path, file_index, blob_shas=blob_shas))
+        mermaid_diagram = cached_stage(url, head_sha, "mermaid", lambda: generate_mermaid_diagram(connections))
         
         return {
             "repo": url,
@@ -286,26 +572,27 @@ def get_architecture_overview(url: str = Query(..., description="GitHub repo URL
     Get comprehensive architecture overview including project summary, file roles, and dependencies.
     """
     try:
-        path = clone_repo(url)
+        path = clone_repo(url, history="full")
+        head_sha = get_head_sha(path)
+        file_index = cached_stage(url, head_sha, "file_index", lambda: build_file_index(path))
+        blob_shas = cached_stage(url, head_sha, "blob_shas", lambda: get_blob_shas(path))
         
         # Get all the data
-        summary_data = extract_project_summary(path)
+        summary_data = cached_stage(url, head_sha, "project_summary", lambda: extract_project_summary(path, file_index))
         summary_text = generate_project_summary_text(summary_data)
         
-        connections = build_dependency_graph(path)
-        mermaid_diagram = generate_mermaid_diagram(connections)
+        connections = cached_stage(url, head_sha, "dependencies", lambda: build_dependency_graph(path, file_index, blob_shas=blob_shas))
+        mermaid_diagram = cached_stage(url, head_sha, "mermaid", lambda: generate_mermaid_diagram(connections))
         
         # Get file roles for key files
-        commits = get_commit_summary(path)
-        owner, repo = extract_repo_owner_name(url)
-        file_evolution = build_file_evolution(owner, repo, commits[:20], None)
+        changes = cached_stage(url, head_sha, "changes", lambda: build_change_store_local(path), source="local")
         
         key_file_roles = {}
         for file_path in list(connections["dependencies"].keys())[:10]:  # Top 10 files
             full_path = os.path.join(path, file_path)
             if os.path.exists(full_path):
-                file_history = file_evolution.get(file_path, [])
-                role_data = analyze_file_role(full_path, file_history)
+                file_history = changes.file_history(file_path)
+                role_data = analyze_file_role(full_path, file_history, blob_shas.get(file_path))
                 key_file_roles[file_path] = role_data
         
         return {
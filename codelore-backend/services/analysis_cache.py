@@ -0,0 +1,193 @@
+# services/analysis_cache.py
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+def normalize_repo_url(repo_url: str) -> str:
+    """
+    Normalize a repository URL so that trivially different spellings share cache entries.
+    """
+    url = repo_url.strip().rstrip('/')
+    if url.endswith('.git'):
+        url = url[:-4]
+    return url.lower()
+
+def _freeze(params: Optional[Dict]) -> tuple:
+    """
+    Turn a parameter dict into a hashable, order-independent key component.
+    """
+    if not params:
+        return ()
+    return tuple(sorted((key, repr(value)) for key, value in params.items()))
+
+def approximate_size(value: Any) -> int:
+    """
+    Estimate the memory held by a stage result: sys.getsizeof over everything reachable
+    through containers, __slots__ and instance dicts, counting shared objects once.
+    """
+    seen = set()
+    total = 0
+    stack = [value]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif hasattr(obj, "__slots__"):
+            stack.extend(getattr(obj, name) for name in obj.__slots__ if hasattr(obj, name))
+        elif hasattr(obj, "__dict__"):
+            stack.append(vars(obj))
+    return total
+
+class _InFlight:
+    """
+    A computation that other callers for the same key can wait on.
+    """
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+class AnalysisCache:
+    """
+    Thread-safe LRU cache for analysis stage results.
+
+    Entries are keyed by (repo URL, HEAD SHA, stage, parameters). When a repo is seen
+    at a new HEAD SHA, every entry for the old SHA of that repo is dropped; other repos
+    are left untouched. Concurrent callers asking for the same key share one computation.
+
+    Stages can be large objects (search indexes, change stores), so besides the entry
+    count the cache is bounded by the approximate memory of its values; a single value
+    over max_bytes is returned but not kept.
+    """
+    def __init__(self, max_entries: int = 256, max_bytes: int = 1024 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._heads = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get_or_compute(self, repo_url: str, head_sha: str, stage: str,
+                       compute: Callable[[], Any], params: Optional[Dict] = None) -> Any:
+        """
+        Return the cached result for this stage, computing and storing it on a miss.
+
+        Args:
+            repo_url (str): Repository URL
+            head_sha (str): Current HEAD commit SHA of the local clone
+            stage (str): Name of the analysis stage (e.g. "commits", "dependencies")
+            compute (Callable): Zero-argument function producing the result
+            params (Dict, optional): Extra parameters that change the result
+
+        Returns:
+            Any: The cached or freshly computed result
+        """
+        repo_key = normalize_repo_url(repo_url)
+        key = (repo_key, head_sha, stage, _freeze(params))
+
+        with self._lock:
+            self._invalidate_stale(repo_key, head_sha)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+            pending = self._in_flight.get(key)
+            if pending is None:
+                self.misses += 1
+                pending = _InFlight()
+                self._in_flight[key] = pending
+                owner = True
+            else:
+                self.hits += 1
+                owner = False
+
+        if not owner:
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.value
+
+        size = 0
+        try:
+            pending.value = compute()
+            size = approximate_size(pending.value)
+        except Exception as e:
+            pending.error = e
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+                if pending.error is None and self._heads.get(repo_key) == head_sha:
+                    if size > self.max_bytes:
+                        self.evictions += 1
+                    else:
+                        self._entries[key] = pending.value
+                        self._sizes[key] = size
+                        self.total_bytes += size
+                        self._evict()
+            pending.done.set()
+
+        return pending.value
+
+    def stats(self) -> Dict:
+        """
+        Return hit/miss counters and current size.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "repos": len(self._heads),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
+
+    def _invalidate_stale(self, repo_key: str, head_sha: str):
+        # Caller holds the lock
+        if self._heads.get(repo_key) != head_sha:
+            if repo_key in self._heads:
+                self._drop_repo(repo_key)
+            self._heads[repo_key] = head_sha
+
+    def _drop_repo(self, repo_key: str):
+        # Caller holds the lock
+        stale = [key for key in self._entries if key[0] == repo_key]
+        for key in stale:
+            del self._entries[key]
+            self.total_bytes -= self._sizes.pop(key)
+        self.invalidations += len(stale)
+
+    def _evict(self):
+        # Caller holds the lock
+        while len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes:
+            key, _ = self._entries.popitem(last=False)
+            self.total_bytes -= self._sizes.pop(key)
+            self.evictions += 1
+
+# Shared by every endpoint in main.py
+analysis_cache = AnalysisCache(
+    int(os.getenv("CODELORE_ANALYSIS_CACHE_ENTRIES", "256")),
+    int(os.getenv("CODELORE_ANALYSIS_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+)
@@ -0,0 +1,122 @@
+# services/blob_cache.py
+import os
+import subprocess
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from services.analysis_cache import approximate_size
+from services.disk_cache import DiskCache
+
+# Bump whenever a cached analyzer (imports/exports, role content checks, symbols) changes its output
+ANALYZER_VERSION = 3
+
+def get_blob_shas(repo_path: str) -> Dict[str, str]:
+    """
+    Map every tracked file to its blob SHA using a single `git ls-files -s` call.
+
+    The clones CodeLore analyzes are clean checkouts, so the index blob matches the
+    file on disk. Returns an empty map when the path is not a git repository.
+    """
+    try:
+        result = subprocess.run(
+            ["git", "-C", repo_path, "ls-files", "-s", "-z"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+    except OSError as e:
+        print(f"Error listing blobs in {repo_path}: {e}")
+        return {}
+    if result.returncode != 0:
+        return {}
+
+    blob_shas = {}
+    for record in result.stdout.split(b"\0"):
+        if not record:
+            continue
+        # "<mode> <sha> <stage>\t<path>"
+        meta, _, path = record.partition(b"\t")
+        parts = meta.split()
+        if len(parts) == 3 and parts[0] != b"160000":  # skip submodules
+            blob_shas[path.decode("utf-8", errors="replace")] = parts[1].decode("ascii")
+    return blob_shas
+
+class BlobCache:
+    """
+    Two-level cache of per-file analysis results keyed by git blob SHA.
+
+    Identical file contents share one entry no matter which repo, fork or commit they
+    came from. A bounded in-memory LRU sits in front of the on-disk store, and every key
+    carries ANALYZER_VERSION so results from older parsers are never reused.
+
+    Symbol results carry source code, so the LRU is bounded by the approximate memory of
+    its values as well as by entry count; a value over max_memory_bytes stays on disk only.
+    """
+    def __init__(self, max_memory_entries: int, max_disk_bytes: int,
+                 max_memory_bytes: int = 256 * 1024 * 1024):
+        self.max_memory_entries = max_memory_entries
+        self.max_memory_bytes = max_memory_bytes
+        self.memory_bytes = 0
+        self._memory = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+        self._disk = DiskCache("blobs", max_disk_bytes)
+        self.memory_hits = 0
+
+    @staticmethod
+    def _key(analyzer: str, blob_sha: str) -> str:
+        return f"{analyzer}:v{ANALYZER_VERSION}:{blob_sha}"
+
+    def get(self, analyzer: str, blob_sha: str) -> Optional[Any]:
+        """
+        Return the cached result of `analyzer` for this blob, or None.
+        """
+        key = self._key(analyzer, blob_sha)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return self._memory[key]
+
+        value = self._disk.get(key)
+        if value is not None:
+            self._remember(key, value)
+        return value
+
+    def set(self, analyzer: str, blob_sha: str, value: Any):
+        """
+        Store the result of `analyzer` for this blob in memory and on disk.
+        """
+        key = self._key(analyzer, blob_sha)
+        self._remember(key, value)
+        self._disk.set(key, value)
+
+    def stats(self) -> Dict:
+        """
+        Return memory and disk hit counters.
+        """
+        with self._lock:
+            memory = {"entries": len(self._memory), "max_entries": self.max_memory_entries,
+                      "bytes": self.memory_bytes, "max_bytes": self.max_memory_bytes,
+                      "hits": self.memory_hits}
+        return {"memory": memory, "disk": self._disk.stats()}
+
+    def _remember(self, key: str, value: Any):
+        size = approximate_size(value)
+        with self._lock:
+            if key in self._memory:
+                del self._memory[key]
+                self.memory_bytes -= self._sizes.pop(key)
+            if size > self.max_memory_bytes:
+                return
+            self._memory[key] = value
+            self._sizes[key] = size
+            self.memory_bytes += size
+            while len(self._memory) > self.max_memory_entries or self.memory_bytes > self.max_memory_bytes:
+                evicted, _ = self._memory.popitem(last=False)
+                self.memory_bytes -= self._sizes.pop(evicted)
+
+blob_cache = BlobCache(
+    int(os.getenv("CODELORE_BLOB_CACHE_ENTRIES", "50000")),
+    int(os.getenv("CODELORE_BLOB_CACHE_MAX_BYTES", str(1024 * 1024 * 1024))),
+    int(os.getenv("CODELORE_BLOB_CACHE_MEMORY_BYTES", str(256 * 1024 * 1024)))
+)
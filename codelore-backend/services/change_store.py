@@ -0,0 +1,321 @@
+# services/change_store.py
+from array import array
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+from services.local_history import STATUS_NAMES, iter_commit_changes
+
+CHURN_WINDOWS = ("day", "week", "month")
+
+def _epoch_seconds(timestamp: str) -> int:
+    try:
+        parsed = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
+        return 0
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+class _Vocabulary:
+    """
+    Maps strings to dense integer ids in order of first appearance.
+    """
+    def __init__(self, values: Iterable[str] = ()):
+        self.values = []
+        self._ids = {}
+        for value in values:
+            self.id(value)
+
+    def id(self, value: str) -> int:
+        value_id = self._ids.get(value)
+        if value_id is None:
+            value_id = len(self.values)
+            self._ids[value] = value_id
+            self.values.append(value)
+        return value_id
+
+    def get(self, value: str) -> Optional[int]:
+        return self._ids.get(value)
+
+class ChangeStore:
+    """
+    Columnar store of file-change events (one per file per commit).
+
+    Paths, authors and change types are integer-coded; commit metadata is stored once
+    per commit and events only hold ids, so memory grows with a handful of integers per
+    change instead of one dict per change. Aggregations (lifecycle stats, churn per time
+    window, per-author totals) are vectorized group-bys over NumPy arrays, and the
+    {filename: [changes]} JSON shape is produced on demand.
+
+    Events are kept in commit order (oldest first), as local_history.iter_commit_changes yields them.
+    """
+    def __init__(self):
+        self.files = _Vocabulary()
+        self.authors = _Vocabulary()
+        self.change_types = _Vocabulary(STATUS_NAMES.values())
+
+        # Per commit
+        self.commit_shas = []
+        self.commit_dates = []
+        self.commit_messages = []
+        self._commit_times = array('q')
+        self._commit_authors = array('i')
+
+        # Per event
+        self._file_ids = array('i')
+        self._commit_ids = array('i')
+        self._additions = array('q')
+        self._deletions = array('q')
+        self._change_codes = array('B')
+
+        self._columns = None
+        self._file_slices = None
+
+    @classmethod
+    def from_commits(cls, commits: Iterable[Dict]) -> "ChangeStore":
+        """
+        Build the store from local_history.iter_commit_changes output.
+        """
+        store = cls()
+        for commit in commits:
+            commit_id = store._add_commit(commit["hash"], commit["date"], commit["msg"], commit["author"])
+            for filename, change in commit["files"].items():
+                store._add_event(commit_id, filename, change.get("status", "modified"),
+                                 change.get("additions", 0), change.get("deletions", 0))
+        return store
+
+    @classmethod
+    def from_evolution(cls, file_evolution: Dict) -> "ChangeStore":
+        """
+        Build the store from diff_parser.build_file_evolution's {filename: [FileChange]} map.
+        """
+        store = cls()
+        commit_ids = {}
+        for filename, changes in file_evolution.items():
+            for change in changes:
+                commit = change.commit
+                commit_id = commit_ids.get(commit.hash)
+                if commit_id is None:
+                    commit_id = store._add_commit(commit.hash, commit.date, commit.msg, commit.author)
+                    commit_ids[commit.hash] = commit_id
+                store._add_event(commit_id, filename, change.change_type, change.additions, change.deletions)
+        return store
+
+    def _add_commit(self, sha: str, date: str, message: str, author: str) -> int:
+        self.commit_shas.append(sha)
+        self.commit_dates.append(date)
+        self.commit_messages.append(message)
+        self._commit_times.append(_epoch_seconds(date))
+        self._commit_authors.append(self.authors.id(author))
+        return len(self.commit_shas) - 1
+
+    def _add_event(self, commit_id: int, filename: str, change_type: str, additions: int, deletions: int):
+        self._file_ids.append(self.files.id(filename))
+        self._commit_ids.append(commit_id)
+        self._additions.append(additions)
+        self._deletions.append(deletions)
+        self._change_codes.append(self.change_types.id(change_type))
+
+    def _arrays(self) -> Dict[str, np.ndarray]:
+        # Frozen NumPy views over the build buffers, created on first use
+        if self._columns is None:
+            commit_ids = np.frombuffer(self._commit_ids, dtype=np.int32) if self._commit_ids else np.zeros(0, np.int32)
+            commit_times = np.frombuffer(self._commit_times, dtype=np.int64) if self._commit_times else np.zeros(0, np.int64)
+            commit_authors = np.frombuffer(self._commit_authors, dtype=np.int32) if self._commit_authors else np.zeros(0, np.int32)
+            self._columns = {
+                "file": np.frombuffer(self._file_ids, dtype=np.int32) if self._file_ids else np.zeros(0, np.int32),
+                "commit": commit_ids,
+                "additions": np.frombuffer(self._additions, dtype=np.int64) if self._additions else np.zeros(0, np.int64),
+                "deletions": np.frombuffer(self._deletions, dtype=np.int64) if self._deletions else np.zeros(0, np.int64),
+                "change": np.frombuffer(self._change_codes, dtype=np.uint8) if self._change_codes else np.zeros(0, np.uint8),
+                "time": commit_times[commit_ids],
+                "author": commit_authors[commit_ids],
+            }
+        return self._columns
+
+    def __len__(self) -> int:
+        return len(self._file_ids)
+
+    def _slices(self):
+        # Event indices grouped by file (stable, so each file's events stay in commit order)
+        if self._file_slices is None:
+            columns = self._arrays()
+            order = np.argsort(columns["file"], kind="stable")
+            counts = np.bincount(columns["file"], minlength=len(self.files.values))
+            bounds = np.concatenate(([0], np.cumsum(counts)))
+            self._file_slices = (order, bounds)
+        return self._file_slices
+
+    def file_history(self, filename: str) -> List[Dict]:
+        """
+        Return one file's changes in the evolution JSON shape, oldest first.
+        """
+        file_id = self.files.get(filename)
+        if file_id is None:
+            return []
+        order, bounds = self._slices()
+        return self._entries(order[bounds[file_id]:bounds[file_id + 1]])
+
+    def _entries(self, event_ids: np.ndarray) -> List[Dict]:
+        columns = self._arrays()
+        commit_ids = columns["commit"][event_ids].tolist()
+        additions = columns["additions"][event_ids].tolist()
+        deletions = columns["deletions"][event_ids].tolist()
+        changes = columns["change"][event_ids].tolist()
+        authors = columns["author"][event_ids].tolist()
+        return [
+            {
+                "commit_sha": self.commit_shas[commit_id],
+                "timestamp": self.commit_dates[commit_id],
+                "change_type": self.change_types.values[change],
+                "additions": added,
+                "deletions": deleted,
+                "summary": self.commit_messages[commit_id],
+                "author": self.authors.values[author]
+            }
+            for commit_id, added, deleted, change, author in zip(commit_ids, additions, deletions, changes, authors)
+        ]
+
+    def to_evolution(self) -> Dict:
+        """
+        Materialize the {filename: [changes]} map from the iter_commit_changes events, oldest first.
+        """
+        order, bounds = self._slices()
+        return {
+            filename: self._entries(order[bounds[file_id]:bounds[file_id + 1]])
+            for file_id, filename in enumerate(self.files.values)
+        }
+
+    def lifecycle_stats(self) -> Dict:
+        """
+        Per-file lifecycle statistics (created_at, last_modified, total_commits, total_additions,
+        total_deletions, net_changes, change_types), computed with grouped reductions.
+        """
+        columns = self._arrays()
+        file_count = len(self.files.values)
+        if not file_count:
+            return {}
+        file_ids = columns["file"]
+
+        counts = np.bincount(file_ids, minlength=file_count)
+        additions = np.bincount(file_ids, weights=columns["additions"], minlength=file_count).astype(np.int64)
+        deletions = np.bincount(file_ids, weights=columns["deletions"], minlength=file_count).astype(np.int64)
+
+        # First and last event per file, in commit order
+        event_ids = np.arange(len(file_ids))
+        first = np.full(file_count, len(file_ids), dtype=np.int64)
+        np.minimum.at(first, file_ids, event_ids)
+        last = np.full(file_count, -1, dtype=np.int64)
+        np.maximum.at(last, file_ids, event_ids)
+        first_commits = columns["commit"][first].tolist()
+        last_commits = columns["commit"][last].tolist()
+
+        # Distinct change types per file
+        type_count = len(self.change_types.values)
+        pairs = np.unique(file_ids.astype(np.int64) * type_count + columns["change"])
+        file_types = {}
+        for pair in pairs.tolist():
+            file_types.setdefault(pair // type_count, []).append(self.change_types.values[pair % type_count])
+
+        counts, additions, deletions = counts.tolist(), additions.tolist(), deletions.tolist()
+        return {
+            filename: {
+                "created_at": self.commit_dates[first_commits[file_id]],
+                "last_modified": self.commit_dates[last_commits[file_id]],
+                "total_commits": counts[file_id],
+                "total_additions": additions[file_id],
+                "total_deletions": deletions[file_id],
+                "net_changes": additions[file_id] - deletions[file_id],
+                "change_types": file_types[file_id]
+            }
+            for file_id, filename in enumerate(self.files.values)
+        }
+
+    def churn(self, window: str = "week") -> List[Dict]:
+        """
+        Lines added and deleted, file changes and distinct commits per time window.
+
+        Args:
+            window (str): "day", "week" (starting Monday, UTC) or "month"
+
+        Returns:
+            List[Dict]: Oldest-first windows that saw changes, with window_start (ISO date),
+            additions, deletions, changes and commits
+        """
+        if window not in CHURN_WINDOWS:
+            raise ValueError(f"Unknown churn window: {window}")
+        columns = self._arrays()
+        if not len(columns["time"]):
+            return []
+
+        days = columns["time"] // 86400
+        if window == "day":
+            buckets = days
+        elif window == "week":
+            # 1970-01-01 was a Thursday; shift so buckets start on Mondays
+            buckets = days - (days + 3) % 7
+        else:
+            buckets = days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+
+        keys, inverse = np.unique(buckets, return_inverse=True)
+        changes = np.bincount(inverse, minlength=len(keys))
+        additions = np.bincount(inverse, weights=columns["additions"], minlength=len(keys)).astype(np.int64)
+        deletions = np.bincount(inverse, weights=columns["deletions"], minlength=len(keys)).astype(np.int64)
+        commit_pairs = np.unique(inverse.astype(np.int64) * len(self.commit_shas) + columns["commit"])
+        commits = np.bincount(commit_pairs // len(self.commit_shas), minlength=len(keys))
+
+        if window == "month":
+            starts = keys.astype("datetime64[M]").astype("datetime64[D]")
+        else:
+            starts = keys.astype("datetime64[D]")
+        return [
+            {"window_start": str(start), "additions": added, "deletions": deleted,
+             "changes": changed, "commits": commit_count}
+            for start, added, deleted, changed, commit_count in zip(
+                starts.tolist(), additions.tolist(), deletions.tolist(), changes.tolist(), commits.tolist())
+        ]
+
+    def author_totals(self) -> List[Dict]:
+        """
+        Per-author commits, file changes, distinct files, additions and deletions,
+        most active (lines added plus deleted) first.
+        """
+        columns = self._arrays()
+        author_count = len(self.authors.values)
+        if not len(columns["author"]):
+            return []
+        authors = columns["author"]
+
+        changes = np.bincount(authors, minlength=author_count)
+        additions = np.bincount(authors, weights=columns["additions"], minlength=author_count).astype(np.int64)
+        deletions = np.bincount(authors, weights=columns["deletions"], minlength=author_count).astype(np.int64)
+        commits = np.bincount(np.frombuffer(self._commit_authors, dtype=np.int32), minlength=author_count)
+        file_pairs = np.unique(authors.astype(np.int64) * len(self.files.values) + columns["file"])
+        files = np.bincount(file_pairs // len(self.files.values), minlength=author_count)
+
+        order = np.lexsort((np.arange(author_count), -(additions + deletions)))
+        return [
+            {
+                "author": self.authors.values[author],
+                "commits": int(commits[author]),
+                "changes": int(changes[author]),
+                "files": int(files[author]),
+                "additions": int(additions[author]),
+                "deletions": int(deletions[author])
+            }
+            for author in order.tolist()
+        ]
+
+def build_change_store_local(repo_path: str, max_commits: Optional[int] = None) -> ChangeStore:
+    """
+    Build the change store from the local clone in one streaming git log pass.
+
+    Args:
+        repo_path (str): Path to the local repository
+        max_commits (int, optional): Only include the most recent N commits
+
+    Returns:
+        ChangeStore: Every file change, oldest commit first
+    """
+    extra_args = [f"--max-count={max_commits}"] if max_commits else []
+    return ChangeStore.from_commits(iter_commit_changes(repo_path, extra_args))
@@ -0,0 +1,354 @@
+# services/clone_store.py
+import json
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Root directory for clones and the byte budget they may use together
+CLONE_DIR = os.getenv("CODELORE_CLONE_DIR", "cloned_repos")
+CLONE_STORE_MAX_BYTES = int(os.getenv("CODELORE_CLONE_STORE_MAX_BYTES", str(10 * 1024 * 1024 * 1024)))
+
+# Clones used within this many seconds are never evicted; an analysis may still be reading them
+EVICTION_GRACE = float(os.getenv("CODELORE_CLONE_EVICTION_GRACE", "600"))
+
+MANIFEST_NAME = "manifest.json"
+
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+
+def _reset_thread_locks():
+    # A forked child inherits locks held by its parent's other threads; start it with fresh ones
+    global _thread_locks, _thread_locks_guard
+    _thread_locks = {}
+    _thread_locks_guard = threading.Lock()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_thread_locks)
+
+@contextmanager
+def repo_lock(local_path: str):
+    """
+    Hold an exclusive per-path lock across threads and processes.
+
+    A threading.Lock serializes callers inside this process; an OS file lock on
+    "<local_path>.lock" serializes uvicorn worker processes sharing the clone directory.
+    """
+    key = os.path.abspath(local_path)
+    with _thread_locks_guard:
+        thread_lock = _thread_locks.setdefault(key, threading.Lock())
+
+    with thread_lock:
+        os.makedirs(os.path.dirname(key), exist_ok=True)
+        with open(f"{key}.lock", 'a+') as lock_file:
+            _lock_file(lock_file)
+            try:
+                yield
+            finally:
+                _unlock_file(lock_file)
+
+def _lock_file(lock_file):
+    if fcntl is not None:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        return
+    # msvcrt.LK_LOCK gives up after ~10 seconds, so keep retrying until the holder is done
+    while True:
+        try:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            time.sleep(0.1)
+
+def _unlock_file(lock_file):
+    if fcntl is not None:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+        return
+    lock_file.seek(0)
+    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+def _safe_component(name: str) -> str:
+    name = re.sub(r'[^A-Za-z0-9._-]', '_', name).strip('.')
+    return name or '_'
+
+def repo_key(repo_url: str) -> str:
+    """
+    Turn a repository URL into a collision-free "host/owner/repo" key.
+
+    Handles https://, ssh://, scp-style (git@host:owner/repo) and file:// URLs.
+    Hosts and paths are lowercased, since GitHub treats owner and repo names
+    case-insensitively, and a trailing ".git" is dropped.
+
+    Args:
+        repo_url (str): Repository URL
+
+    Returns:
+        str: Relative key with '/'-separated, filesystem-safe components
+    """
+    url = repo_url.strip().rstrip('/')
+    if url.endswith('.git'):
+        url = url[:-4]
+
+    scp_like = re.match(r'^[\w.-]+@([^:/]+):(.+)$', url)
+    if scp_like:
+        host, path = scp_like.group(1), scp_like.group(2)
+    else:
+        parsed = urlparse(url)
+        host = parsed.hostname or "local"
+        path = parsed.path if parsed.scheme else url
+
+    parts = [_safe_component(part) for part in path.lower().split('/') if part]
+    if not parts:
+        raise ValueError(f"Cannot derive a repository name from {repo_url}")
+    if len(parts) == 1:
+        parts.insert(0, '_')
+    return '/'.join([_safe_component(host.lower())] + parts)
+
+def directory_size(path: str) -> int:
+    """
+    Total size in bytes of every file below path, without following symlinks.
+    """
+    total = 0
+    stack = [path]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        else:
+                            total += entry.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return total
+
+class CloneStore:
+    """
+    Disk-bounded store of repository clones.
+
+    Clones live under <root>/<host>/<owner>/<repo>, so forks with the same name never
+    share a directory. A JSON manifest records each clone's URL, size and last access;
+    it is updated under a file lock, so every uvicorn worker sees the same view. When
+    the total size passes max_bytes, the least recently used clones are removed until
+    the store is back under 90% of the budget. Clones used within the eviction grace
+    period are kept even if that leaves the store over budget.
+    """
+    def __init__(self, root: str, max_bytes: int, eviction_grace: float = EVICTION_GRACE):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.eviction_grace = eviction_grace
+        self.manifest_path = os.path.join(root, MANIFEST_NAME)
+        self.evictions = 0
+
+    def path_for(self, repo_url: str) -> str:
+        """
+        Return the local directory for a repository URL.
+        """
+        return os.path.join(self.root, *repo_key(repo_url).split('/'))
+
+    @contextmanager
+    def _manifest(self):
+        # Read-modify-write of the manifest under its own lock; yields the entries dict
+        with repo_lock(self.manifest_path):
+            entries = self._read_manifest()
+            yield entries
+            self._write_manifest(entries)
+
+    def _read_manifest(self) -> Dict:
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f).get("clones", {})
+        except (OSError, ValueError):
+            return {}
+
+    def _write_manifest(self, entries: Dict):
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f"{self.manifest_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"clones": entries}, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    def touch(self, repo_url: str, measure: bool = False, reference_url: Optional[str] = None):
+        """
+        Record an access to a clone, re-measuring its size after a clone or fetch.
+
+        Args:
+            repo_url (str): Repository URL
+            measure (bool): Recompute the clone's size on disk
+            reference_url (str, optional): Store clone this one borrows objects from;
+                pass "" after a fresh clone that borrows nothing
+        """
+        key = repo_key(repo_url)
+        path = self.path_for(repo_url)
+        size = directory_size(path) if measure else None
+        with self._manifest() as entries:
+            entry = entries.setdefault(key, {"url": repo_url, "bytes": 0})
+            entry["url"] = repo_url
+            entry["last_access"] = time.time()
+            if size is not None:
+                entry["bytes"] = size
+            elif not entry["bytes"]:
+                entry["bytes"] = directory_size(path)
+            if reference_url:
+                entry["reference"] = repo_key(reference_url)
+            elif reference_url is not None:
+                entry.pop("reference", None)
+
+    def find_clone(self, repo_url: str) -> Optional[str]:
+        """
+        Return the path of a complete (non-shallow, non-partial) clone of repo_url, if the store has one.
+
+        Only complete clones can lend their objects to another clone through alternates.
+        """
+        path = self.path_for(repo_url)
+        git_dir = os.path.join(path, ".git")
+        if not os.path.isdir(git_dir) or os.path.exists(os.path.join(git_dir, "shallow")):
+            return None
+        try:
+            result = subprocess.run(
+                ["git", "-C", path, "config", "--get", "remote.origin.promisor"],
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE
+            )
+        except OSError:
+            return None
+        if result.stdout.strip() == b"true":
+            return None
+        return path
+
+    def dependents(self, repo_url: str) -> List[str]:
+        """
+        Return the URLs of clones that borrow objects from repo_url's clone.
+        """
+        key = repo_key(repo_url)
+        return [entry["url"] for entry in self._read_manifest().values() if entry.get("reference") == key]
+
+    def dissociate(self, repo_url: str):
+        """
+        Copy every borrowed object into a clone and drop its alternates.
+
+        The caller must hold the clone's repo lock (and the referenced clone's, so it
+        cannot disappear halfway through the repack).
+        """
+        path = self.path_for(repo_url)
+        alternates = os.path.join(path, ".git", "objects", "info", "alternates")
+        if os.path.exists(alternates):
+            subprocess.run(["git", "-C", path, "repack", "-a", "-d", "-q"],
+                           check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            os.remove(alternates)
+        size = directory_size(path)
+        with self._manifest() as entries:
+            entry = entries.get(repo_key(repo_url))
+            if entry is not None:
+                entry.pop("reference", None)
+                entry["bytes"] = size
+
+    def evict(self, keep: Optional[str] = None) -> List[str]:
+        """
+        Remove least recently used clones until the store fits its budget.
+
+        Each victim is removed while holding its repo lock, and skipped if it was used
+        again after being picked. Clones that borrow objects from a victim through
+        alternates are dissociated first, so they stay complete once it is gone. Must
+        not be called while holding a repo lock.
+
+        Args:
+            keep (str, optional): URL of a clone that must not be evicted
+
+        Returns:
+            List[str]: URLs of the evicted clones
+        """
+        keep_key = repo_key(keep) if keep else None
+        entries = self._read_manifest()
+        total = sum(entry.get("bytes", 0) for entry in entries.values())
+        if total <= self.max_bytes:
+            return []
+
+        target = int(self.max_bytes * 0.9)
+        cutoff = time.time() - self.eviction_grace
+        candidates = sorted(
+            (entry.get("last_access", 0), key) for key, entry in entries.items()
+            if key != keep_key and entry.get("last_access", 0) < cutoff
+        )
+
+        evicted = []
+        for last_access, key in candidates:
+            if total <= target:
+                break
+            path = os.path.join(self.root, *key.split('/'))
+            with repo_lock(path):
+                if self._read_manifest().get(key, {}).get("last_access") != last_access:
+                    continue
+                # Lock order is always reference before dependent, as in clone_repo
+                if not self._dissociate_dependents(entries[key]["url"]):
+                    continue
+                with self._manifest() as current:
+                    entry = current.pop(key, None)
+                    if entry is None:
+                        continue
+                    shutil.rmtree(path, ignore_errors=True)
+            total -= entry.get("bytes", 0)
+            self.evictions += 1
+            evicted.append(entry["url"])
+            print(f"Evicted clone {entry['url']} ({entry.get('bytes', 0)} bytes)")
+        return evicted
+
+    def _dissociate_dependents(self, repo_url: str) -> bool:
+        # Caller holds repo_url's lock; returns False if any dependent could not be made self-contained
+        for dependent_url in self.dependents(repo_url):
+            with repo_lock(self.path_for(dependent_url)):
+                try:
+                    self.dissociate(dependent_url)
+                except (OSError, subprocess.CalledProcessError) as e:
+                    print(f"Error dissociating {dependent_url} from {repo_url}: {e}")
+                    return False
+        return True
+
+    def stats(self) -> Dict:
+        """
+        Return the store's size, budget and per-clone usage, most recently used first.
+        """
+        entries = self._read_manifest()
+        clones = sorted(
+            ({"key": key, "url": entry["url"], "bytes": entry.get("bytes", 0),
+              "last_access": entry.get("last_access", 0), "reference": entry.get("reference")}
+             for key, entry in entries.items()),
+            key=lambda clone: clone["last_access"],
+            reverse=True
+        )
+        return {
+            "root": os.path.abspath(self.root),
+            "bytes": sum(clone["bytes"] for clone in clones),
+            "max_bytes": self.max_bytes,
+            "clones": len(clones),
+            "evictions": self.evictions,
+            "entries": clones
+        }
+
+_stores = {}
+_stores_guard = threading.Lock()
+
+def get_clone_store(root: str = None) -> CloneStore:
+    """
+    Return the shared CloneStore for a root directory (CODELORE_CLONE_DIR by default).
+    """
+    root = root or CLONE_DIR
+    with _stores_guard:
+        store = _stores.get(os.path.abspath(root))
+        if store is None:
+            store = CloneStore(root, CLONE_STORE_MAX_BYTES)
+            _stores[os.path.abspath(root)] = store
+        return store
@@ -1,24 +1,78 @@
 import ast
+import re
+from services.blob_cache import blob_cache
+
+SYMBOL_NODES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+LINE_BREAK = re.compile(rb'\r\n|\r|\n')
+
+def extract_python_symbols(file_path, blob_sha=None):
+    # Unchanged blobs are served from the blob cache without reparsing
+    if blob_sha:
+        cached = blob_cache.get("python_symbols", blob_sha)
+        if cached is not None:
+            return cached
 
-def extract_python_symbols(file_path):
     with open(file_path, "r", encoding="utf-8") as f:
         source = f.read()
 
+    results = extract_symbols_from_source(source)
+    if results is None:
+        return []
+
+    if blob_sha:
+        blob_cache.set("python_symbols", blob_sha, results)
+    return results
+
+def extract_symbols_from_source(source):
+    """
+    Extract classes and functions from Python source, or None if it does not parse.
+
+    Symbols come out in ast.walk (breadth-first) order. Code segments are sliced from
+    line offsets computed once per file, instead of ast.get_source_segment re-splitting
+    the whole source for every node. `parent` is the dotted name of the nearest
+    enclosing class, if any.
+    """
     try:
         tree = ast.parse(source)
-    except SyntaxError:
-        return []
+    except (SyntaxError, ValueError):
+        return None
+
+    # AST column offsets count UTF-8 bytes, so slice the encoded source
+    source_bytes = source.encode("utf-8")
+    line_starts = [0] + [match.end() for match in LINE_BREAK.finditer(source_bytes)]
+
+    def segment(node):
+        if getattr(node, "end_lineno", None) is None:
+            return None
+        start = line_starts[node.lineno - 1] + node.col_offset
+        end = line_starts[node.end_lineno - 1] + node.end_col_offset
+        return source_bytes[start:end].decode("utf-8")
+
+    parents = {}
+    def record_parents(node, enclosing_class):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, SYMBOL_NODES):
+                parents[id(child)] = enclosing_class
+            if isinstance(child, ast.ClassDef):
+                qualified = f"{enclosing_class}.{child.name}" if enclosing_class else child.name
+                record_parents(child, qualified)
+            else:
+                record_parents(child, enclosing_class)
+    record_parents(tree, None)
 
     results = []
 
     for node in ast.walk(tree):
-        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        if isinstance(node, SYMBOL_NODES):
             results.append({
                 "type": "function" if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) else "class",
                 "name": node.name,
                 "start_line": node.lineno,
+                "end_line": node.end_lineno,
+                "parent": parents.get(id(node)),
                 "docstring": ast.get_docstring(node),
-                "code": ast.get_source_segment(source, node),
+                "code": segment(node),
             })
 
-    return results 
\ No newline at end of file
+    return results
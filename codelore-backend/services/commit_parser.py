@@ -1,27 +1,101 @@
-from pydriller import Repository
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+from services.local_history import is_partial_clone, iter_commit_metadata, run_git
+from services.records import CommitRecord
+
+# Bump when the shape of indexed commit entries changes so old indexes are rebuilt
+COMMIT_INDEX_VERSION = 1
 
 def get_commit_summary(repo_path):
     """
     Parse commit history from a repository.
     
+    The parsed history is persisted in a per-repo commit index together with the last
+    indexed SHA. Later calls only read commits added since then; if that SHA is no
+    longer an ancestor of HEAD (force-push, rebase), the index is rebuilt from scratch.
+    
     Args:
         repo_path (str): Path to the local repository
         
     Returns:
-        list: List of commit data dictionaries
+        List[CommitRecord]: Oldest-first commits; use `to_dict()` to serialize them
+    """
+    head_sha = run_git(repo_path, ["rev-parse", "HEAD"]).stdout.strip()
+    renames = not is_partial_clone(repo_path)
+    index = load_commit_index(repo_path)
+    if index and index.get("renames") != renames:
+        index = None
+    
+    if index:
+        indexed = [CommitRecord.from_dict(commit) for commit in index["commits"]]
+    
+    if index and index["head"] == head_sha:
+        return indexed
+    
+    if index and _is_ancestor(repo_path, index["head"], head_sha):
+        data = indexed + _read_commits(repo_path, [f"{index['head']}..{head_sha}"])
+    else:
+        data = _read_commits(repo_path)
+    
+    save_commit_index(repo_path, head_sha, data, renames)
+    return data
+
+def _read_commits(repo_path: str, revisions: Optional[List[str]] = None) -> List[CommitRecord]:
+    """
+    Read commit metadata with the streaming git log reader, optionally limited to a revision range.
+    
+    This skips diff computation entirely; `files` keeps the base names pydriller used to report.
     """
     data = []
-    for commit in Repository(repo_path).traverse_commits():
-        # Get modified files using the correct pydriller API
-        modified_files = []
-        for modified_file in commit.modified_files:
-            modified_files.append(modified_file.filename)
-        
-        data.append({
-            "hash": commit.hash,
-            "msg": commit.msg,
-            "author": commit.author.name,
-            "date": commit.author_date.isoformat(),
-            "files": modified_files,
-        })
-    return data 
\ No newline at end of file
+    for commit in iter_commit_metadata(repo_path, revisions):
+        data.append(CommitRecord(commit["hash"], commit["msg"], commit["author"], commit["date"],
+                                 [os.path.basename(path) for path in commit["paths"]]))
+    return data
+
+def _is_ancestor(repo_path: str, ancestor_sha: str, head_sha: str) -> bool:
+    """
+    Check whether the previously indexed SHA is still part of HEAD's history.
+    """
+    result = run_git(repo_path, ["merge-base", "--is-ancestor", ancestor_sha, head_sha], check=False)
+    return result.returncode == 0
+
+def _index_path(repo_path: str) -> str:
+    return os.path.join(repo_path, ".git", "codelore", "commit_index.json")
+
+def load_commit_index(repo_path: str) -> Optional[Dict]:
+    """
+    Load the persisted commit index for a repo, or None if it is missing or outdated.
+    """
+    index_path = _index_path(repo_path)
+    if not os.path.exists(index_path):
+        return None
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable commit index {index_path}: {e}")
+        return None
+    
+    if index.get("version") != COMMIT_INDEX_VERSION or not index.get("head"):
+        return None
+    return index
+
+def save_commit_index(repo_path: str, head_sha: str, commits: List[CommitRecord], renames: bool = True):
+    """
+    Persist the commit index atomically so concurrent readers never see a partial file.
+    
+    Args:
+        repo_path (str): Path to the local repository
+        head_sha (str): Last indexed commit
+        commits (List[CommitRecord]): Oldest-first commits up to head_sha
+        renames (bool): Whether renames were detected (False for blobless clones)
+    """
+    index_path = _index_path(repo_path)
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    tmp_path = f"{index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"version": COMMIT_INDEX_VERSION, "head": head_sha, "renames": renames,
+                   "commits": [commit.to_dict() for commit in commits]}, f)
+    os.replace(tmp_path, index_path)
@@ -1,11 +1,38 @@
+import math
 import os
 import re
-from typing import Dict, List, Set, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import repeat
+from typing import Dict, List, Optional, Set, Tuple
 from pathlib import Path
+from services.blob_cache import blob_cache, get_blob_shas
+from services.file_index import build_file_index, in_ignored_dir
+from services.import_resolver import ModuleIndex, resolve_internal_edges
 
-def build_dependency_graph(repo_path: str) -> Dict:
+# Directories whose files are never treated as project code
+EXCLUDED_CODE_DIRS = {'node_modules', '__pycache__', 'venv', '.git'}
+
+# Worker processes used to parse code files; 1 disables the process pool
+DEFAULT_WORKERS = int(os.getenv("CODELORE_WORKERS", str(os.cpu_count() or 1)))
+
+# Below this many files, parsing stays serial because pool startup would dominate
+PARALLEL_MIN_FILES = int(os.getenv("CODELORE_PARALLEL_MIN_FILES", "400"))
+
+# Smallest number of files handed to a worker at once
+PARALLEL_CHUNK_SIZE = 32
+
+# Python import statements: "from <module> import <names>" and "import <module>[, <module>]"
+PYTHON_FROM_IMPORT = re.compile(r'^[ \t]*from[ \t]+(\.+[\w.]*|[a-zA-Z_][\w.]*)[ \t]+import[ \t]+(\([^)]*\)|[^\n#;]+)', re.MULTILINE)
+PYTHON_IMPORT = re.compile(r'^[ \t]*import[ \t]+([a-zA-Z_][\w.]*(?:[ \t]+as[ \t]+\w+)?(?:[ \t]*,[ \t]*[a-zA-Z_][\w.]*(?:[ \t]+as[ \t]+\w+)?)*)', re.MULTILINE)
+
+def build_dependency_graph(repo_path: str, file_index: List[Dict] = None, workers: int = None,
+                           blob_shas: Dict[str, str] = None) -> Dict:
     """
     Build a dependency graph showing how files are connected.
+    Pass the shared file index and blob SHA map to avoid rescanning the repository.
+    Files whose blob was parsed before are served from the blob cache; the rest are
+    parsed in parallel across `workers` processes (CODELORE_WORKERS by default) on large repos.
     """
     connections = {
         "imports": [],
@@ -15,67 +42,152 @@ def build_dependency_graph(repo_path: str) -> Dict:
     }
     
     # Get all code files
-    code_files = get_code_files(repo_path)
+    code_files = get_code_files(repo_path, file_index)
     
-    for file_path in code_files:
-        file_ext = Path(file_path).suffix.lower()
-        full_path = os.path.join(repo_path, file_path)
+    # Results come back in code_files order, so the graph is the same in serial and parallel mode
+    if blob_shas is None:
+        blob_shas = get_blob_shas(repo_path)
+    
+    for file_path, result in analyze_code_files(repo_path, code_files, workers, blob_shas):
+        if result is None:
+            continue
         
-        if os.path.exists(full_path):
-            try:
-                with open(full_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    
-                # Extract imports
-                imports = extract_imports(content, file_ext, repo_path)
-                connections["imports"].extend(imports)
-                
-                # Extract exports
-                exports = extract_exports(content, file_ext)
-                connections["exports"].extend(exports)
-                
-                # Build dependency map
-                connections["dependencies"][file_path] = {
-                    "imports": imports,
-                    "exports": exports,
-                    "imported_by": []
-                }
-                
-                # Build file map for easy lookup
-                connections["file_map"][file_path] = {
-                    "path": file_path,
-                    "type": categorize_file_type(file_path),
-                    "size": len(content.split('\n'))
-                }
-                
-            except Exception as e:
-                print(f"Error reading {file_path}: {e}")
+        imports = result["imports"]
+        exports = result["exports"]
+        connections["imports"].extend(imports)
+        connections["exports"].extend(exports)
+        
+        # Build dependency map
+        connections["dependencies"][file_path] = {
+            "imports": imports,
+            "exports": exports,
+            "imported_by": []
+        }
+        
+        # Build file map for easy lookup
+        connections["file_map"][file_path] = {
+            "path": file_path,
+            "type": result["type"],
+            "size": result["size"]
+        }
     
     # Build reverse dependencies (who imports what)
     build_reverse_dependencies(connections)
     
     return connections
 
-def get_code_files(repo_path: str) -> List[str]:
+def analyze_code_file(repo_path: str, file_path: str) -> Optional[Dict]:
+    """
+    Read one code file and extract its imports, exports, type and line count.
+    Returns None if the file is missing or cannot be read.
+    """
+    file_ext = Path(file_path).suffix.lower()
+    full_path = os.path.join(repo_path, file_path)
+    
+    if not os.path.exists(full_path):
+        return None
+    
+    try:
+        with open(full_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        
+        return {
+            "imports": extract_imports(content, file_ext, repo_path),
+            "exports": extract_exports(content, file_ext),
+            "type": categorize_file_type(file_path),
+            "size": len(content.split('\n'))
+        }
+    except Exception as e:
+        print(f"Error reading {file_path}: {e}")
+        return None
+
+def _analyze_code_chunk(repo_path: str, file_paths: List[str]) -> List[Tuple[str, Optional[Dict]]]:
+    # Worker entry point; must stay at module level so it can be pickled
+    return [(file_path, analyze_code_file(repo_path, file_path)) for file_path in file_paths]
+
+def analyze_code_files(repo_path: str, code_files: List[str], workers: int = None,
+                       blob_shas: Dict[str, str] = None) -> List[Tuple[str, Optional[Dict]]]:
+    """
+    Analyze code files, reusing cached results for unchanged blobs and splitting the
+    rest across a process pool when there are enough of them.
+    
+    Args:
+        repo_path (str): Path to the local repository
+        code_files (List[str]): Repo-relative paths to analyze
+        workers (int, optional): Worker processes; <= 1 forces serial mode
+        blob_shas (Dict[str, str], optional): Git blob SHA per path, from get_blob_shas
+        
+    Returns:
+        List[Tuple[str, Optional[Dict]]]: (file_path, result) pairs in code_files order
+    """
+    blob_shas = blob_shas or {}
+    results = {}
+    pending = []
+    
+    for file_path in code_files:
+        blob_sha = blob_shas.get(file_path)
+        cached = blob_cache.get(_blob_analyzer(file_path), blob_sha) if blob_sha else None
+        if cached is not None:
+            # The file type depends on the path, not the content, so it is never cached
+            results[file_path] = dict(cached, type=categorize_file_type(file_path))
+        else:
+            pending.append(file_path)
+    
+    for file_path, result in _analyze_uncached(repo_path, pending, workers):
+        blob_sha = blob_shas.get(file_path)
+        if result is not None and blob_sha:
+            blob_cache.set(_blob_analyzer(file_path), blob_sha, {
+                "imports": result["imports"],
+                "exports": result["exports"],
+                "size": result["size"]
+            })
+        results[file_path] = result
+    
+    return [(file_path, results.get(file_path)) for file_path in code_files]
+
+def _blob_analyzer(file_path: str) -> str:
+    # Import/export parsing depends on the extension as well as the content
+    return f"dependencies{Path(file_path).suffix.lower()}"
+
+def _analyze_uncached(repo_path: str, code_files: List[str], workers: int = None) -> List[Tuple[str, Optional[Dict]]]:
+    workers = DEFAULT_WORKERS if workers is None else workers
+    
+    # Pool startup costs more than it saves on small repos
+    if workers <= 1 or len(code_files) < PARALLEL_MIN_FILES:
+        return _analyze_code_chunk(repo_path, code_files)
+    
+    chunk_size = max(PARALLEL_CHUNK_SIZE, math.ceil(len(code_files) / (workers * 4)))
+    chunks = [code_files[i:i + chunk_size] for i in range(0, len(code_files), chunk_size)]
+    
+    try:
+        results = []
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+            for chunk_results in executor.map(_analyze_code_chunk, repeat(repo_path), chunks):
+                results.extend(chunk_results)
+        return results
+    except (OSError, BrokenProcessPool) as e:
+        print(f"Parallel parsing failed, falling back to serial: {e}")
+        return _analyze_code_chunk(repo_path, code_files)
+
+def get_code_files(repo_path: str, file_index: List[Dict] = None) -> List[str]:
     """
     Get all code files in the repository.
     """
+    if file_index is None:
+        file_index = build_file_index(repo_path)
+    
     code_files = []
     
-    for root, dirs, files in os.walk(repo_path):
+    for entry in file_index:
         # Skip hidden directories and common exclusions
-        dirs[:] = [d for d in dirs if not d.startswith('.') and d not in ['node_modules', '__pycache__', 'venv', '.git']]
+        if in_ignored_dir(entry, EXCLUDED_CODE_DIRS, skip_hidden=True):
+            continue
+        if entry["name"].startswith('.'):
+            continue
         
-        for file in files:
-            if file.startswith('.'):
-                continue
-                
-            file_path = os.path.join(root, file)
-            rel_path = os.path.relpath(file_path, repo_path)
-            
-            # Only include code files
-            if is_code_file(file):
-                code_files.append(rel_path.replace('\\', '/'))  # Normalize path separators
+        # Only include code files
+        if is_code_file(entry["name"]):
+            code_files.append(entry["path"])  # Index paths already use '/'
     
     return code_files
 
@@ -137,30 +249,25 @@ def extract_imports(content: str, file_ext: str, repo_path: str) -> List[Dict]:
                     })
     
     elif file_ext == '.py':
-        # Python imports
-        import_patterns = [
-            r'from\s+([a-zA-Z_][a-zA-Z0-9_.]*)\s+import',
-            r'import\s+([a-zA-Z_][a-zA-Z0-9_.]*)',
-            r'from\s+\.([a-zA-Z_][a-zA-Z0-9_.]*)\s+import'
-        ]
-        
-        for pattern in import_patterns:
-            matches = re.findall(pattern, content)
-            for match in matches:
-                if match and not match.startswith('.'):
-                    # External dependency
+        # Python imports, anchored at the start of a statement so the "import y" inside
+        # "from x import y" is not read as a second, absolute import of y
+        for module, names in re.findall(PYTHON_FROM_IMPORT, content):
+            names = re.sub(r'#[^\n]*', '', names).strip('()').replace('\\', ' ')
+            imported = [name.split()[0] for name in names.split(',') if name.split() and name.split()[0].isidentifier()]
+            imports.append({
+                "type": "internal" if module.startswith('.') else "external",
+                "module": module,
+                "source": "relative" if module.startswith('.') else "unknown",
+                "names": imported
+            })
+        for modules in re.findall(PYTHON_IMPORT, content):
+            for module in modules.split(','):
+                if module.strip():
                     imports.append({
                         "type": "external",
-                        "module": match,
+                        "module": module.split()[0],
                         "source": "unknown"
                     })
-                elif match and match.startswith('.'):
-                    # Internal dependency
-                    imports.append({
-                        "type": "internal",
-                        "module": match,
-                        "source": "relative"
-                    })
     
     return imports
 
@@ -234,21 +341,22 @@ def categorize_file_type(file_path: str) -> str:
 def build_reverse_dependencies(connections: Dict):
     """
     Build reverse dependency map (who imports what).
+    Each internal import is resolved to a file once; the resolved edges are kept in
+    connections["edges"] as {importer: [imported files]} and imported_by is filled in a
+    single pass over them.
     """
-    for file_path, deps in connections["dependencies"].items():
-        for import_info in deps["imports"]:
-            if import_info["type"] == "internal":
-                # Find which files import this one
-                for other_file, other_deps in connections["dependencies"].items():
-                    if other_file != file_path:
-                        # This is a simplified check - in a real implementation,
-                        # you'd need to resolve the actual file paths
-                        if any(imp["module"] in file_path for imp in other_deps["imports"]):
-                            deps["imported_by"].append(other_file)
+    index = ModuleIndex(connections["dependencies"].keys())
+    edges = resolve_internal_edges(connections["dependencies"], index)
+    connections["edges"] = edges
+    
+    for importer, targets in edges.items():
+        for target in targets:
+            connections["dependencies"][target]["imported_by"].append(importer)
 
 def generate_mermaid_diagram(connections: Dict, max_nodes: int = 20) -> str:
     """
-    Generate a Mermaid.js diagram from the dependency graph.
+    Generate a Mermaid.js diagram from the dependency graph, drawing the import edges
+    build_reverse_dependencies already resolved.
     """
     # Limit the number of nodes to prevent overwhelming diagrams
     files = list(connections["dependencies"].keys())[:max_nodes]
@@ -264,39 +372,21 @@ def generate_mermaid_diagram(connections: Dict, max_nodes: int = 20) -> str:
     # Add edges (imports)
     edge_count = 0
     max_edges = 30  # Limit edges to prevent cluttered diagrams
+    shown_files = set(files)
     
     for file_path in files:
         if edge_count >= max_edges:
             break
             
-        deps = connections["dependencies"][file_path]
         source_id = file_path.replace('/', '_').replace('.', '_').replace('-', '_')
         
-        for import_info in deps["imports"]:
+        for target_file in connections["edges"].get(file_path, []):
             if edge_count >= max_edges:
                 break
                 
-            if import_info["type"] == "internal":
-                # Try to find the target file
-                target_file = find_target_file(import_info["module"], files)
-                if target_file:
-                    target_id = target_file.replace('/', '_').replace('.', '_').replace('-', '_')
-                    mermaid_lines.append(f'    {source_id} --> {target_id}')
-                    edge_count += 1
+            if target_file in shown_files:
+                target_id = target_file.replace('/', '_').replace('.', '_').replace('-', '_')
+                mermaid_lines.append(f'    {source_id} --> {target_id}')
+                edge_count += 1
     
     return '\n'.join(mermaid_lines)
-
-def find_target_file(module_path: str, available_files: List[str]) -> str:
-    """
-    Find the actual file path for a module import.
-    This is a simplified implementation.
-    """
-    # Remove leading dots and file extensions
-    clean_module = module_path.lstrip('.').replace('.js', '').replace('.py', '')
-    
-    # Look for matching files
-    for file_path in available_files:
-        if clean_module in file_path or file_path.endswith(f'/{clean_module}.js') or file_path.endswith(f'/{clean_module}.py'):
-            return file_path
-    
-    return None 
\ No newline at end of file
@@ -1,9 +1,173 @@
+import hashlib
 import os
+import threading
+import time
 import requests
-from typing import Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from typing import Any, Dict, List, Optional
 from datetime import datetime
+from services.disk_cache import DiskCache
+from services.records import CommitRecord, FileChange
 
-def get_commit_diff(owner: str, repo: str, commit_sha: str, github_token: Optional[str] = None) -> List[Dict]:
+# Base URL of the GitHub REST API; point it at a local stand-in server for testing
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")
+
+# Pause when fewer than this many requests remain in the current rate-limit window
+RATE_LIMIT_THRESHOLD = int(os.getenv("GITHUB_RATE_LIMIT_THRESHOLD", "5"))
+
+# Longest we are willing to pause for a rate-limit reset before giving up on remaining requests
+MAX_RATE_LIMIT_WAIT = float(os.getenv("GITHUB_MAX_RATE_LIMIT_WAIT", "60"))
+
+DEFAULT_FETCH_WORKERS = int(os.getenv("GITHUB_FETCH_WORKERS", "8"))
+
+# Seconds to wait for GitHub to connect or send data; clone_repo's fork lookup waits on this too
+REQUEST_TIMEOUT = float(os.getenv("GITHUB_REQUEST_TIMEOUT", "10"))
+
+# Permanent response cache; commit payloads addressed by full SHA never change
+response_cache = DiskCache("github", int(os.getenv("GITHUB_CACHE_MAX_BYTES", str(512 * 1024 * 1024))))
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_github_session(pool_size: int = 32) -> requests.Session:
+    """
+    Return the shared keep-alive session used for all GitHub API calls.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update({
+                "Accept": "application/vnd.github.v3+json",
+                "User-Agent": "CodeLore-Backend"
+            })
+            _session = session
+        return _session
+
+class RateLimiter:
+    """
+    Shared pause gate driven by GitHub's X-RateLimit-Remaining / X-RateLimit-Reset headers.
+    """
+    def __init__(self, threshold: int = RATE_LIMIT_THRESHOLD, max_wait: float = MAX_RATE_LIMIT_WAIT):
+        self.threshold = threshold
+        self.max_wait = max_wait
+        self._resume_at = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> bool:
+        """
+        Block until the rate-limit window allows another request.
+        Returns False if that would take longer than max_wait.
+        """
+        with self._lock:
+            delay = self._resume_at - time.time()
+        if delay <= 0:
+            return True
+        if delay > self.max_wait:
+            return False
+        time.sleep(delay)
+        return True
+
+    def update(self, response: requests.Response):
+        """
+        Record the rate-limit state reported by a response.
+        """
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        reset = response.headers.get("X-RateLimit-Reset")
+        if remaining is None or reset is None:
+            return
+        try:
+            remaining, reset = int(remaining), float(reset)
+        except ValueError:
+            return
+        if remaining <= self.threshold:
+            with self._lock:
+                self._resume_at = max(self._resume_at, reset + 1)
+
+def _is_rate_limited(response: requests.Response) -> bool:
+    return response.status_code in (403, 429) and response.headers.get("X-RateLimit-Remaining") == "0"
+
+def _parse_commit_files(commit_data: Dict) -> List[Dict]:
+    files_changed = []
+    for file in commit_data.get("files", []):
+        files_changed.append({
+            "filename": file["filename"],
+            "status": file["status"],  # added, modified, removed
+            "additions": file.get("additions", 0),
+            "deletions": file.get("deletions", 0),
+            "changes": file.get("changes", 0),
+            "patch": file.get("patch", ""),  # The actual diff
+            "raw_url": file.get("raw_url", "")
+        })
+    return files_changed
+
+def get_github_json(api_path: str, github_token: Optional[str] = None, immutable: bool = False,
+                    session: Optional[requests.Session] = None,
+                    rate_limiter: Optional[RateLimiter] = None) -> Any:
+    """
+    GET a GitHub API resource through the on-disk response cache.
+    
+    Responses fetched with a token are cached under a fingerprint of that token, so a
+    private repo's payload is never served to a caller without the same token.
+    Immutable resources (e.g. commits addressed by full SHA) are served straight from the
+    cache once stored. Mutable ones are revalidated with If-None-Match, and a 304 reuses
+    the cached body without spending rate-limit budget.
+    
+    Args:
+        api_path (str): Path below the API root, e.g. "repos/{owner}/{repo}/commits/{sha}"
+        github_token (str, optional): GitHub API token
+        immutable (bool): Whether the resource can never change once fetched
+        session (requests.Session, optional): Session to reuse; defaults to the shared pool
+        rate_limiter (RateLimiter, optional): Pause gate shared between concurrent fetches
+        
+    Returns:
+        Any: Decoded JSON body
+        
+    Raises:
+        requests.RequestException: On HTTP or connection errors, or when the rate limit is exhausted
+    """
+    cache_key = f"{GITHUB_API_URL}/{api_path}".lower()
+    if github_token:
+        cache_key += f"#token:{hashlib.sha256(github_token.encode('utf-8')).hexdigest()[:16]}"
+    cached = response_cache.get(cache_key)
+    if cached is not None and immutable:
+        return cached["body"]
+    
+    session = session or get_github_session()
+    rate_limiter = rate_limiter or RateLimiter()
+    
+    headers = {}
+    if github_token:
+        headers["Authorization"] = f"token {github_token}"
+    if cached is not None and cached.get("etag"):
+        headers["If-None-Match"] = cached["etag"]
+    
+    for _ in range(2):
+        if not rate_limiter.wait():
+            raise requests.RequestException(f"GitHub rate limit exhausted for {api_path}")
+        response = session.get(f"{GITHUB_API_URL}/{api_path}", headers=headers, timeout=REQUEST_TIMEOUT)
+        rate_limiter.update(response)
+        if not _is_rate_limited(response):
+            break
+    
+    if response.status_code == 304 and cached is not None:
+        return cached["body"]
+    
+    response.raise_for_status()
+    body = response.json()
+    response_cache.set(cache_key, {"etag": response.headers.get("ETag"), "body": body})
+    return body
+
+def _is_full_sha(value: str) -> bool:
+    return len(value) == 40 and all(c in "0123456789abcdef" for c in value.lower())
+
+def get_commit_diff(owner: str, repo: str, commit_sha: str, github_token: Optional[str] = None,
+                    session: Optional[requests.Session] = None,
+                    rate_limiter: Optional[RateLimiter] = None) -> List[Dict]:
     """
     Get detailed diff information for a specific commit using GitHub API.
     
@@ -12,42 +176,51 @@ def get_commit_diff(owner: str, repo: str, commit_sha: str, github_token: Option
         repo (str): Repository name
         commit_sha (str): Commit SHA
         github_token (str, optional): GitHub API token for higher rate limits
+        session (requests.Session, optional): Session to reuse; defaults to the shared pool
+        rate_limiter (RateLimiter, optional): Pause gate shared between concurrent fetches
         
     Returns:
         List[Dict]: List of file changes with diff details
+        
+    Raises:
+        requests.RequestException: If the diff cannot be fetched; callers must not treat a
+        missing diff as a commit without changes
     """
-    url = f"https://api.github.com/repos/{owner}/{repo}/commits/{commit_sha}"
-    
-    headers = {
-        "Accept": "application/vnd.github.v3+json",
-        "User-Agent": "CodeLore-Backend"
-    }
-    
-    if github_token:
-        headers["Authorization"] = f"token {github_token}"
+    api_path = f"repos/{owner}/{repo}/commits/{commit_sha}"
+    commit_data = get_github_json(api_path, github_token, immutable=_is_full_sha(commit_sha),
+                                  session=session, rate_limiter=rate_limiter)
+    return _parse_commit_files(commit_data)
+
+def fetch_commit_diffs(owner: str, repo: str, commit_shas: List[str], github_token: Optional[str] = None,
+                       max_workers: int = DEFAULT_FETCH_WORKERS) -> List[List[Dict]]:
+    """
+    Fetch commit diffs concurrently over the shared keep-alive session.
     
-    try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        commit_data = response.json()
-        
-        files_changed = []
-        for file in commit_data.get("files", []):
-            files_changed.append({
-                "filename": file["filename"],
-                "status": file["status"],  # added, modified, removed
-                "additions": file.get("additions", 0),
-                "deletions": file.get("deletions", 0),
-                "changes": file.get("changes", 0),
-                "patch": file.get("patch", ""),  # The actual diff
-                "raw_url": file.get("raw_url", "")
-            })
+    Args:
+        owner (str): Repository owner
+        repo (str): Repository name
+        commit_shas (List[str]): Commit SHAs to fetch
+        github_token (str, optional): GitHub API token
+        max_workers (int): Maximum number of requests in flight
         
-        return files_changed
+    Returns:
+        List[List[Dict]]: File changes per commit, in the same order as commit_shas
         
-    except requests.RequestException as e:
-        print(f"Error fetching commit diff: {e}")
+    Raises:
+        requests.RequestException: If any diff cannot be fetched, so a partial history is
+        never returned (and cached) as if it were complete
+    """
+    if not commit_shas:
         return []
+    
+    session = get_github_session()
+    rate_limiter = RateLimiter()
+    
+    def fetch(commit_sha):
+        return get_commit_diff(owner, repo, commit_sha, github_token, session, rate_limiter)
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(commit_shas)))) as executor:
+        return list(executor.map(fetch, commit_shas))
 
 def extract_repo_owner_name(repo_url: str) -> tuple:
     """
@@ -67,76 +240,56 @@ def extract_repo_owner_name(repo_url: str) -> tuple:
     
     raise ValueError(f"Invalid GitHub URL format: {repo_url}")
 
-def build_file_evolution(owner: str, repo: str, commits: List[Dict], github_token: Optional[str] = None) -> Dict:
+def get_fork_upstreams(owner: str, repo: str, github_token: Optional[str] = None) -> List[str]:
+    """
+    Look up which repositories a GitHub fork was forked from.
+    
+    Args:
+        owner (str): Repository owner
+        repo (str): Repository name
+        github_token (str, optional): GitHub API token
+        
+    Returns:
+        List[str]: Clone URLs of the direct parent and the root of the fork network,
+        nearest first; empty for repositories that are not forks
+    """
+    info = get_github_json(f"repos/{owner}/{repo}", github_token)
+    upstreams = []
+    for field in ("parent", "source"):
+        upstream = info.get(field) or {}
+        url = upstream.get("clone_url") or upstream.get("html_url")
+        if url and url not in upstreams:
+            upstreams.append(url)
+    return upstreams
+
+def build_file_evolution(owner: str, repo: str, commits: List[CommitRecord], github_token: Optional[str] = None) -> Dict:
     """
     Build a complete file evolution map from commit history.
     
     Args:
         owner (str): Repository owner
         repo (str): Repository name
-        commits (List[Dict]): List of commit data from pydriller
+        commits (List[CommitRecord]): Commits from get_commit_summary
         github_token (str, optional): GitHub API token
         
     Returns:
-        Dict: File evolution mapping {filename: [changes]}
+        Dict: File evolution mapping {filename: [FileChange]}; each change references its
+        commit instead of copying the message and author, see FileChange.to_dict()
     """
     file_evolution = {}
     
-    for commit in commits:
-        commit_sha = commit["hash"]
-        timestamp = commit["date"]
-        
-        # Get detailed diff for this commit
-        file_changes = get_commit_diff(owner, repo, commit_sha, github_token)
-        
+    # Fetch all diffs concurrently; results come back in commit order
+    all_changes = fetch_commit_diffs(owner, repo, [commit.hash for commit in commits], github_token)
+    
+    for commit, file_changes in zip(commits, all_changes):
         for change in file_changes:
             filename = change["filename"]
             
             if filename not in file_evolution:
                 file_evolution[filename] = []
             
-            file_evolution[filename].append({
-                "commit_sha": commit_sha,
-                "timestamp": timestamp,
-                "change_type": change["status"],
-                "additions": change["additions"],
-                "deletions": change["deletions"],
-                "summary": commit["msg"],
-                "author": commit["author"]
-            })
+            file_evolution[filename].append(
+                FileChange(commit, change["status"], change["additions"], change["deletions"])
+            )
     
     return file_evolution
-
-def get_file_lifecycle_stats(file_evolution: Dict) -> Dict:
-    """
-    Calculate lifecycle statistics for each file.
-    
-    Args:
-        file_evolution (Dict): File evolution mapping
-        
-    Returns:
-        Dict: File lifecycle statistics
-    """
-    stats = {}
-    
-    for filename, changes in file_evolution.items():
-        if not changes:
-            continue
-            
-        first_change = changes[0]
-        last_change = changes[-1]
-        
-        total_additions = sum(c["additions"] for c in changes)
-        total_deletions = sum(c["deletions"] for c in changes)
-        
-        stats[filename] = {
-            "created_at": first_change["timestamp"],
-            "last_modified": last_change["timestamp"],
-            "total_commits": len(changes),
-            "total_additions": total_additions,
-            "total_deletions": total_deletions,
-            "net_changes": total_additions - total_deletions,
-            "change_types": list(set(c["change_type"] for c in changes))
-        }
-    
-    return stats 
\ No newline at end of file
@@ -0,0 +1,145 @@
+# services/disk_cache.py
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+# Root for every persistent CodeLore cache (HTTP responses, parsed files, summaries, ...)
+CACHE_DIR = os.getenv("CODELORE_CACHE_DIR", ".codelore_cache")
+
+class DiskCache:
+    """
+    Content-addressed JSON store on disk with size-bounded LRU eviction.
+
+    Each key is hashed with SHA-256 and stored as its own file under
+    <CACHE_DIR>/<namespace>/<2 hex chars>/<hash>.json. Reads bump the file's mtime,
+    and when the namespace grows past max_bytes the least recently used files are
+    removed until it is back under 90% of the budget.
+    """
+    def __init__(self, namespace: str, max_bytes: int, root: Optional[str] = None):
+        self.namespace = namespace
+        self.max_bytes = max_bytes
+        self.directory = os.path.join(root or CACHE_DIR, namespace)
+        self._lock = threading.Lock()
+        self._total_bytes = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _path(self, key: str) -> str:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest[:2], f"{digest}.json")
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Return the stored value for key, or None on a miss.
+        """
+        return self.get_any([key])
+
+    def get_any(self, keys: List[str]) -> Optional[Any]:
+        """
+        Return the value of the first key that is stored, or None. Counts as one lookup.
+        """
+        for key in keys:
+            value = self._read(key)
+            if value is not None:
+                with self._lock:
+                    self.hits += 1
+                return value
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _read(self, key: str) -> Optional[Any]:
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+
+        # Guard against hash collisions and foreign files
+        if entry.get("key") != key:
+            return None
+        return entry.get("value")
+
+    def set(self, key: str, value: Any):
+        """
+        Store a JSON-serializable value under key, evicting old entries if over budget.
+        """
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = json.dumps({"key": key, "value": value}).encode("utf-8")
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+        try:
+            previous_size = os.path.getsize(path)
+        except OSError:
+            previous_size = 0
+
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = self._scan_size()
+            else:
+                self._total_bytes += len(data) - previous_size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def stats(self) -> Dict:
+        """
+        Return hit/miss counters and the current on-disk size.
+        """
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = self._scan_size()
+            lookups = self.hits + self.misses
+            return {
+                "namespace": self.namespace,
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions
+            }
+
+    def _iter_files(self):
+        if not os.path.isdir(self.directory):
+            return
+        for bucket in os.scandir(self.directory):
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                if entry.name.endswith(".json"):
+                    yield entry
+
+    def _scan_size(self) -> int:
+        # Caller holds the lock
+        return sum(entry.stat().st_size for entry in self._iter_files())
+
+    def _evict(self):
+        # Caller holds the lock
+        entries = []
+        for entry in self._iter_files():
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self.evictions += 1
+        self._total_bytes = total
@@ -1,10 +1,13 @@
 import os
 import re
 from typing import Dict, List, Optional
+from services.blob_cache import blob_cache
 
-def analyze_file_role(file_path: str, file_history: List[Dict] = None) -> Dict:
+def analyze_file_role(file_path: str, file_history: List[Dict] = None, blob_sha: Optional[str] = None) -> Dict:
     """
     Analyze a file to determine its role and purpose in the project.
+    When the file's git blob SHA is given, the content checks (complexity, dependencies,
+    key functions) are reused from the blob cache instead of being parsed again.
     """
     role_data = {
         "role": "",
@@ -25,13 +28,23 @@ def analyze_file_role(file_path: str, file_history: List[Dict] = None) -> Dict:
     role_data["role"] = determine_file_role(filename, dir_path, file_history)
     
     # Analyze complexity and dependencies
-    if os.path.exists(file_path):
+    analyzer = f"role_content{file_ext}"
+    cached = blob_cache.get(analyzer, blob_sha) if blob_sha else None
+    if cached is not None:
+        role_data.update(cached)
+    elif os.path.exists(file_path):
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
                 content = f.read()
                 role_data["complexity"] = assess_complexity(content, file_ext)
                 role_data["dependencies"] = extract_dependencies(content, file_ext)
                 role_data["key_functions"] = extract_key_functions(content, file_ext)
+            if blob_sha:
+                blob_cache.set(analyzer, blob_sha, {
+                    "complexity": role_data["complexity"],
+                    "dependencies": role_data["dependencies"],
+                    "key_functions": role_data["key_functions"]
+                })
         except:
             pass
     
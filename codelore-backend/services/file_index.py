@@ -0,0 +1,80 @@
+# services/file_index.py
+import os
+from typing import Dict, Iterable, List
+
+# Directories no analysis ever looks inside, so the index never descends into them
+SKIP_DIRS = {'.git', '__pycache__', 'node_modules'}
+
+def build_file_index(repo_path: str) -> List[Dict]:
+    """
+    Scan the repository once with os.scandir and record every file.
+
+    Files come out in the same order os.walk would produce them (a directory's files
+    first, then its subdirectories), so consumers that used to walk the tree themselves
+    keep their output order.
+
+    Args:
+        repo_path (str): Path to the local repository
+
+    Returns:
+        List[Dict]: One entry per file with path (relative, '/'-separated), name, ext,
+        dirs (tuple of parent directory names), size and mtime
+    """
+    index = []
+    _scan_directory(repo_path, "", (), index)
+    return index
+
+def _scan_directory(dir_path: str, rel_dir: str, dirs: tuple, index: List[Dict]):
+    try:
+        with os.scandir(dir_path) as it:
+            entries = list(it)
+    except OSError as e:
+        print(f"Error scanning {dir_path}: {e}")
+        return
+
+    subdirs = []
+    for entry in entries:
+        try:
+            is_dir = entry.is_dir()
+        except OSError:
+            is_dir = False
+
+        if is_dir:
+            # Like os.walk, list symlinked directories but never follow them
+            if entry.name not in SKIP_DIRS and not entry.is_symlink():
+                subdirs.append(entry)
+            continue
+
+        try:
+            stat = entry.stat()
+            size, mtime = stat.st_size, stat.st_mtime
+        except OSError:
+            size, mtime = 0, 0.0
+
+        index.append({
+            "path": f"{rel_dir}/{entry.name}" if rel_dir else entry.name,
+            "name": entry.name,
+            "ext": os.path.splitext(entry.name)[1],
+            "dirs": dirs,
+            "size": size,
+            "mtime": mtime
+        })
+
+    for entry in subdirs:
+        child_rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+        _scan_directory(entry.path, child_rel, dirs + (entry.name,), index)
+
+def in_ignored_dir(entry: Dict, ignore_dirs: Iterable[str], skip_hidden: bool = False) -> bool:
+    """
+    Check whether a file index entry lives below any ignored (or, optionally, hidden) directory.
+    """
+    for name in entry["dirs"]:
+        if name in ignore_dirs or (skip_hidden and name.startswith('.')):
+            return True
+    return False
+
+def native_path(entry: Dict) -> str:
+    """
+    Return the entry's relative path with the platform's separator.
+    """
+    return entry["path"].replace('/', os.sep)
@@ -1,25 +1,266 @@
-from git import Repo
+from git import Git, Repo
+from git.exc import GitCommandError, InvalidGitRepositoryError, NoSuchPathError
+from services.clone_store import get_clone_store, repo_lock
+from services.diff_parser import extract_repo_owner_name, get_fork_upstreams
+from contextlib import ExitStack
 import os
+import shutil
+import time
 
-def clone_repo(repo_url: str, target_dir: str = "cloned_repos"):
+# How much history an analysis needs, cheapest first:
+#   "head"    - only the checked-out tree (depth-limited clone)
+#   "commits" - the full commit graph; file contents are fetched on demand (blobless clone)
+#   "full"    - every object, for diff-heavy analysis such as file evolution
+HISTORY_LEVELS = {"head": 0, "commits": 1, "full": 2}
+
+# Existing clones older than this many seconds are fetched and reset before use
+REFRESH_INTERVAL = float(os.getenv("CODELORE_REFRESH_INTERVAL", "300"))
+
+# Marker touched after every clone or fetch, used to decide when to refresh
+FETCH_MARKER = "codelore-last-fetch"
+
+def clone_repo(repo_url: str, target_dir: str = None, history: str = "full",
+               depth: int = None, refresh_interval: float = None,
+               reference_url: str = None, github_token: str = None, revision: str = None):
     """
-    Clone a GitHub repository to a local directory.
-    
+    Clone a GitHub repository to a local directory, or bring an existing clone up to date.
+
+    Clones live in the clone store under <target_dir>/<host>/<owner>/<repo>, which
+    records each access and evicts least recently used clones once the store passes
+    CODELORE_CLONE_STORE_MAX_BYTES.
+
+    Concurrent callers for the same repo, in this process or another uvicorn worker,
+    are serialized on a per-repo lock: the first one clones or fetches while the others
+    wait and then reuse its result.
+
+    The cheapest clone that covers `history` is used: a depth-limited clone for "head",
+    a partial clone (--filter=blob:none) for "commits" and a full clone for "full". An
+    existing clone is deepened/refetched only when it holds less than requested, and is
+    refreshed with fetch-and-reset once it is older than `refresh_interval`.
+
+    A new clone of a fork borrows objects from its upstream when the store already
+    holds a complete clone of it: git clone --reference sets up alternates, so only
+    the objects the fork adds are downloaded. The upstream is taken from
+    `reference_url`, or looked up through the GitHub API for github.com URLs.
+
+    With `revision`, the checkout is pinned to that commit: if the clone's HEAD is
+    anywhere else, the remote HEAD is fetched and the checkout reset to `revision`.
+
     Args:
         repo_url (str): The GitHub repository URL
-        target_dir (str): Directory to store cloned repos
-        
+        target_dir (str, optional): Root of the clone store (defaults to CODELORE_CLONE_DIR)
+        history (str): "head", "commits" or "full"
+        depth (int, optional): Number of commits to keep for "head" clones (default 1)
+        refresh_interval (float, optional): Seconds before an existing clone is refreshed;
+            defaults to CODELORE_REFRESH_INTERVAL, negative disables refreshing
+        reference_url (str, optional): Upstream whose store clone may lend objects
+        github_token (str, optional): GitHub API token for the fork lookup
+        revision (str, optional): Commit SHA the checkout must be at on return
+
     Returns:
         str: Path to the cloned repository
     """
-    if not os.path.exists(target_dir):
-        os.makedirs(target_dir)
-    
-    repo_name = repo_url.rstrip('/').split('/')[-1]
-    local_path = os.path.join(target_dir, repo_name)
-    
-    if os.path.exists(local_path):
-        return local_path  # Already cloned
-    
-    Repo.clone_from(repo_url, local_path)
-    return local_path 
\ No newline at end of file
+    if history not in HISTORY_LEVELS:
+        raise ValueError(f"Unknown history level: {history}")
+    if refresh_interval is None:
+        refresh_interval = REFRESH_INTERVAL
+
+    store = get_clone_store(target_dir)
+    local_path = store.path_for(repo_url)
+    os.makedirs(os.path.dirname(local_path), exist_ok=True)
+
+    with ExitStack() as locks:
+        upstream_url = None
+        if not os.path.exists(local_path):
+            upstream_url = _find_upstream_clone(store, repo_url, reference_url, github_token)
+            if upstream_url:
+                # Hold the upstream's lock first, the same order eviction uses, so it
+                # cannot be removed while the fork is being cloned against it
+                locks.enter_context(repo_lock(store.path_for(upstream_url)))
+        locks.enter_context(repo_lock(local_path))
+
+        repo = _open_clone(local_path)
+        if repo is None:
+            reference_path = store.find_clone(upstream_url) if upstream_url else None
+            _clone(repo_url, local_path, history, depth, reference_path)
+            upstream_url = upstream_url if reference_path else ""
+            fetched = True
+        else:
+            upstream_url = None
+            fetched = _ensure_history(repo, history, depth)
+            if not fetched and refresh_interval >= 0 and _seconds_since_fetch(repo) > refresh_interval:
+                _refresh(repo, None)
+                fetched = True
+        if revision and get_head_sha(local_path) != revision:
+            _refresh(repo or Repo(local_path), revision)
+            fetched = True
+        store.touch(repo_url, measure=fetched, reference_url=upstream_url)
+
+    if fetched:
+        store.evict(keep=repo_url)
+    return local_path
+
+def _open_clone(local_path: str):
+    """
+    Open an existing clone, removing leftovers that are not a usable repository.
+    """
+    if not os.path.exists(local_path):
+        return None
+    try:
+        repo = Repo(local_path)
+        repo.head.commit
+        return repo
+    except (InvalidGitRepositoryError, NoSuchPathError, ValueError) as e:
+        print(f"Removing unusable clone at {local_path}: {e}")
+        shutil.rmtree(local_path, ignore_errors=True)
+        return None
+
+def _find_upstream_clone(store, repo_url: str, reference_url: str = None,
+                         github_token: str = None):
+    """
+    Pick the upstream whose store clone a new fork clone can borrow objects from.
+    """
+    if reference_url:
+        candidates = [reference_url]
+    else:
+        try:
+            owner, name = extract_repo_owner_name(repo_url)
+            candidates = get_fork_upstreams(owner, name, github_token)
+        except Exception as e:
+            # Not a GitHub URL, or the API is unreachable; clone without a reference
+            if not isinstance(e, ValueError):
+                print(f"Error looking up upstream of {repo_url}: {e}")
+            return None
+
+    for candidate in candidates:
+        if store.path_for(candidate) != store.path_for(repo_url) and store.find_clone(candidate):
+            return candidate
+    return None
+
+def _clone(repo_url: str, local_path: str, history: str, depth: int = None,
+           reference_path: str = None):
+    # Clone next to the final location and rename, so no one ever sees a half-written checkout
+    tmp_path = f"{local_path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    options = {"reference": os.path.abspath(reference_path)} if reference_path else {}
+    try:
+        if history == "head":
+            Repo.clone_from(repo_url, tmp_path, depth=depth or 1, **options)
+        elif history == "commits":
+            Repo.clone_from(repo_url, tmp_path, filter="blob:none", **options)
+        else:
+            Repo.clone_from(repo_url, tmp_path, **options)
+        _mark_fetched(Repo(tmp_path))
+        os.rename(tmp_path, local_path)
+    finally:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+def get_clone_history(repo: Repo) -> str:
+    """
+    Report how much history an existing clone holds: "head", "commits" or "full".
+    """
+    if os.path.exists(os.path.join(repo.git_dir, "shallow")):
+        return "head"
+    with repo.config_reader() as config:
+        if config.has_option('remote "origin"', "partialclonefilter"):
+            return "commits"
+    return "full"
+
+def _ensure_history(repo: Repo, history: str, depth: int = None) -> bool:
+    """
+    Deepen or refetch the clone if it holds less history than requested.
+    Returns True if anything was fetched.
+    """
+    current = get_clone_history(repo)
+
+    if current == "head":
+        if history != "head":
+            # Unshallowing fetches everything that is missing, which also covers "full"
+            repo.git.fetch("--unshallow", "origin")
+        elif depth and int(repo.git.rev_list("--count", "HEAD")) < depth:
+            repo.git.fetch(f"--depth={depth}", "origin")
+        else:
+            return False
+    elif current == "commits" and history == "full":
+        # Drop the partial-clone filter and fetch every object once
+        with repo.config_writer() as config:
+            config.remove_option('remote "origin"', "partialclonefilter")
+        repo.git.fetch("--refetch", "origin")
+        with repo.config_writer() as config:
+            config.remove_option('remote "origin"', "promisor")
+    else:
+        return False
+
+    _mark_fetched(repo)
+    return True
+
+def refresh_clone(local_path: str, revision: str = None):
+    """
+    Fetch the remote's HEAD and hard-reset the checkout to it, keeping the clone's depth or filter.
+
+    Args:
+        local_path (str): Path to an existing clone
+        revision (str, optional): Reset to this commit instead of the fetched HEAD; it must
+            be in the fetched history (e.g. a remote HEAD read earlier with ls-remote)
+    """
+    with repo_lock(local_path):
+        _refresh(Repo(local_path), revision)
+
+def _refresh(repo: Repo, revision: str = None):
+    # Callers hold the clone's repo_lock
+    if get_clone_history(repo) == "head":
+        depth = int(repo.git.rev_list("--count", "HEAD"))
+        repo.git.fetch(f"--depth={depth}", "origin", "HEAD")
+    else:
+        repo.git.fetch("origin", "HEAD")
+    target = "FETCH_HEAD"
+    if revision:
+        try:
+            repo.git.cat_file("-e", f"{revision}^{{commit}}")
+        except GitCommandError:
+            raise RuntimeError(f"Commit {revision} is not in the history fetched from the remote")
+        target = revision
+    repo.git.reset("--hard", target)
+    _mark_fetched(repo)
+
+def _mark_fetched(repo: Repo):
+    marker = os.path.join(repo.git_dir, FETCH_MARKER)
+    with open(marker, 'w') as f:
+        f.write(str(time.time()))
+
+def _seconds_since_fetch(repo: Repo) -> float:
+    marker = os.path.join(repo.git_dir, FETCH_MARKER)
+    try:
+        return time.time() - os.path.getmtime(marker)
+    except OSError:
+        return float("inf")
+
+
+def get_head_sha(repo_path: str) -> str:
+    """
+    Get the commit SHA that HEAD points to in a local clone.
+
+    Args:
+        repo_path (str): Path to the local repository
+
+    Returns:
+        str: Full hex SHA of the HEAD commit
+    """
+    return Repo(repo_path).head.commit.hexsha
+
+def get_remote_head_sha(repo_url: str) -> str:
+    """
+    Ask the remote which commit its HEAD points to, without cloning or fetching.
+
+    Args:
+        repo_url (str): The repository URL
+
+    Returns:
+        str: Full hex SHA of the remote HEAD, or None if the remote cannot be reached
+    """
+    try:
+        output = Git().ls_remote(repo_url, "HEAD")
+    except Exception as e:
+        print(f"Error reading remote HEAD of {repo_url}: {e}")
+        return None
+    return output.split()[0] if output else None
@@ -0,0 +1,219 @@
+# services/hunk_index.py
+import hashlib
+import json
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+from services.local_history import FIELD_SEP, RECORD_SEP, run_git
+
+# Bump when the shape of stored hunk indexes changes so old ones are rebuilt
+HUNK_INDEX_VERSION = 1
+
+# Subject only: a full message body could contain lines that look like diff headers
+HUNK_LOG_FORMAT = f"--format={RECORD_SEP}%H{FIELD_SEP}%an{FIELD_SEP}%aI{FIELD_SEP}%s"
+
+HUNK_HEADER = re.compile(r'^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@')
+
+def _read_file_commits(repo_path: str, path: str, revisions: Optional[List[str]] = None) -> List[Dict]:
+    """
+    Diff a file's history with zero context lines and keep only the hunk headers.
+
+    Returns:
+        List[Dict]: Newest-first commits with hash, author, date, msg, filename (the
+        file's path in that commit), created (True for the commit that added it) and
+        hunks as [old_start, old_count, new_start, new_count]
+    """
+    args = ["log", "--follow", "-p", "-U0", "-M", "--no-color", "--no-ext-diff", HUNK_LOG_FORMAT]
+    args += (revisions or []) + ["--", path]
+    output = run_git(repo_path, args).stdout
+
+    commits = []
+    commit = None
+    remaining_old = remaining_new = 0
+    for line in output.split("\n"):
+        # Inside a hunk body every line is content, even if it looks like a header
+        if remaining_old or remaining_new:
+            if line.startswith("-") and remaining_old:
+                remaining_old -= 1
+            elif line.startswith("+") and remaining_new:
+                remaining_new -= 1
+            continue
+
+        if line.startswith(RECORD_SEP):
+            fields = line[1:].split(FIELD_SEP)
+            commit = {"hash": fields[0], "author": fields[1], "date": fields[2], "msg": fields[3],
+                      "filename": path, "created": False, "hunks": []}
+            commits.append(commit)
+        elif commit is None:
+            continue
+        elif line.startswith("diff --git "):
+            # "diff --git a/<old> b/<new>"; refined below by rename/+++ lines when present
+            commit["filename"] = line.rsplit(" b/", 1)[-1]
+        elif line.startswith("rename to "):
+            commit["filename"] = line[len("rename to "):]
+        elif line.startswith("--- /dev/null") or line.startswith("new file mode"):
+            commit["created"] = True
+        elif line.startswith("+++ b/"):
+            commit["filename"] = line[len("+++ b/"):]
+        elif line.startswith("@@ "):
+            match = HUNK_HEADER.match(line)
+            if match:
+                old_start, old_count, new_start, new_count = (
+                    int(value) if value is not None else 1 for value in match.groups()
+                )
+                commit["hunks"].append([old_start, old_count, new_start, new_count])
+                remaining_old, remaining_new = old_count, new_count
+    return commits
+
+def _map_range_to_parent(hunks: List[List[int]], start: int, end: int) -> Tuple[Optional[Tuple[int, int]], List[Tuple[int, int]]]:
+    """
+    Map a line range in a commit's version of a file back to its parent's version.
+
+    Lines outside hunks shift by the net size of the hunks before them; lines inside a
+    hunk map to the whole old side of that hunk.
+
+    Returns:
+        ((old_start, old_end), or None if this commit added every line of the range,
+         [(start, end) of the lines in the range this commit touched, in its own version])
+    """
+    old_lines = []
+    touched = []
+    delta = 0
+    for old_start, old_count, new_start, new_count in sorted(hunks, key=lambda hunk: hunk[2]):
+        # With a zero count the hunk sits between lines: after line `start` of that side
+        first = new_start if new_count else new_start + 1
+        last = new_start + new_count - 1 if new_count else new_start
+
+        if start <= min(end, first - 1):
+            old_lines += [start + delta, min(end, first - 1) + delta]
+
+        if new_count:
+            if start <= last and end >= first:
+                touched.append((max(start, first), min(end, last)))
+                if old_count:
+                    old_lines += [old_start, old_start + old_count - 1]
+        elif start <= new_start < end:
+            # Lines deleted between two lines of the range
+            touched.append((new_start, new_start + 1))
+            old_lines += [old_start, old_start + old_count - 1]
+
+        delta += old_count - new_count
+        start = max(start, last + 1)
+        if start > end:
+            break
+
+    if start <= end:
+        old_lines += [start + delta, end + delta]
+
+    if not old_lines:
+        return None, touched
+    return (min(old_lines), max(old_lines)), touched
+
+def _is_ancestor(repo_path: str, ancestor_sha: str, head_sha: str) -> bool:
+    result = run_git(repo_path, ["merge-base", "--is-ancestor", ancestor_sha, head_sha], check=False)
+    return result.returncode == 0
+
+def _index_path(repo_path: str, path: str) -> str:
+    digest = hashlib.sha256(path.encode("utf-8")).hexdigest()
+    return os.path.join(repo_path, ".git", "codelore", "hunks", f"{digest}.json")
+
+def load_hunk_index(repo_path: str, path: str) -> Optional[Dict]:
+    """
+    Load the persisted hunk index of one file, or None if it is missing or outdated.
+    """
+    index_path = _index_path(repo_path, path)
+    if not os.path.exists(index_path):
+        return None
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable hunk index {index_path}: {e}")
+        return None
+
+    if index.get("version") != HUNK_INDEX_VERSION or index.get("path") != path or not index.get("head"):
+        return None
+    return index
+
+def save_hunk_index(repo_path: str, path: str, head_sha: str, commits: List[Dict]):
+    """
+    Persist a file's hunk index atomically so concurrent readers never see a partial file.
+    """
+    index_path = _index_path(repo_path, path)
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    tmp_path = f"{index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"version": HUNK_INDEX_VERSION, "path": path, "head": head_sha, "commits": commits}, f)
+    os.replace(tmp_path, index_path)
+
+def get_hunk_index(repo_path: str, path: str) -> List[Dict]:
+    """
+    Return a file's hunk index, building it on first use and extending it as commits arrive.
+
+    The index lists every commit that touched the file (following renames), newest
+    first, with the hunk headers of its zero-context diff. It is stored per file under
+    .git/codelore/hunks; when HEAD moves forward only the new commits are diffed, and
+    if the stored head is no longer in HEAD's history (force-push) it is rebuilt.
+
+    Args:
+        repo_path (str): Path to the local repository
+        path (str): Repo-relative path of the file at HEAD
+
+    Returns:
+        List[Dict]: Newest-first commits with hash, author, date, msg, filename, created and hunks
+    """
+    head_sha = run_git(repo_path, ["rev-parse", "HEAD"]).stdout.strip()
+    index = load_hunk_index(repo_path, path)
+
+    if index and index["head"] == head_sha:
+        return index["commits"]
+
+    if index and _is_ancestor(repo_path, index["head"], head_sha):
+        commits = _read_file_commits(repo_path, path, [f"{index['head']}..{head_sha}"]) + index["commits"]
+    else:
+        commits = _read_file_commits(repo_path, path)
+
+    save_hunk_index(repo_path, path, head_sha, commits)
+    return commits
+
+def get_line_history(repo_path: str, path: str, start: int, end: int) -> List[Dict]:
+    """
+    Find the commits that touched lines start..end (1-based, inclusive) of a file at HEAD.
+
+    The range is traced backwards through the hunk index: each commit's hunks say
+    which lines of the range it changed and where the range sat in the parent version.
+    Tracing stops once every line of the range was introduced, or at the commit that
+    created the file. On branchy histories commits are traced in git log order, so
+    positions across merged branches are approximate.
+
+    Args:
+        repo_path (str): Path to the local repository
+        path (str): Repo-relative path of the file at HEAD
+        start (int): First line of the range
+        end (int): Last line of the range
+
+    Returns:
+        List[Dict]: Newest-first commits with commit_sha, author, timestamp, summary,
+        filename and lines, the touched (start, end) ranges in that commit's version
+    """
+    if start < 1 or end < start:
+        raise ValueError(f"Invalid line range {start}-{end}")
+
+    history = []
+    current = (start, end)
+    for commit in get_hunk_index(repo_path, path):
+        parent_range, touched = _map_range_to_parent(commit["hunks"], *current)
+        if touched:
+            history.append({
+                "commit_sha": commit["hash"],
+                "author": commit["author"],
+                "timestamp": commit["date"],
+                "summary": commit["msg"],
+                "filename": commit["filename"],
+                "lines": [list(lines) for lines in touched]
+            })
+        if commit["created"] or parent_range is None:
+            break
+        current = parent_range
+    return history
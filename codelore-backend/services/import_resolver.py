@@ -0,0 +1,175 @@
+# services/import_resolver.py
+import posixpath
+from typing import Dict, Iterable, List, Optional
+
+# Extensions tried, in order, for extensionless JavaScript/TypeScript specifiers
+JS_EXTENSIONS = ['.ts', '.tsx', '.js', '.jsx', '.mjs', '.cjs', '.vue', '.svelte']
+
+PYTHON_EXTENSIONS = ('.py', '.pyi', '.pyx')
+
+class ModuleIndex:
+    """
+    Resolves import specifiers to repository file paths.
+
+    Built once per dependency graph from the list of known files:
+    - a file set for relative JS/TS specifiers (extension probing, index files),
+    - a dotted-module map for Python, computed from package roots (the first
+      ancestor directory without an __init__.py), with the root each module lives under.
+    Each lookup costs O(path depth) dictionary/set probes instead of a scan over every file.
+    """
+    def __init__(self, file_paths: Iterable[str]):
+        self.files = set(file_paths)
+        self._python_modules = {}
+        self._python_roots = {}
+        self._packages = set()
+
+        package_dirs = {
+            posixpath.dirname(path) for path in self.files
+            if posixpath.basename(path) in ('__init__.py', '__init__.pyi')
+        }
+
+        for path in sorted(self.files):
+            stem, ext = posixpath.splitext(path)
+            if ext not in PYTHON_EXTENSIONS:
+                continue
+            parts = stem.split('/')
+            root, module = self._python_module_name(parts, package_dirs)
+            if module:
+                self._python_modules.setdefault(module, []).append(path)
+                self._python_roots[path] = root
+                if parts[-1] == '__init__':
+                    # Top-level packages the repo defines, e.g. "src/myapp/__init__.py" -> "myapp"
+                    self._packages.add(module.split('.')[0])
+
+    @staticmethod
+    def _python_module_name(parts: List[str], package_dirs: set):
+        # Climb while the parent directory is a package; what remains above is the root
+        root = len(parts) - 1
+        while root > 0 and '/'.join(parts[:root]) in package_dirs:
+            root -= 1
+        names = parts[root:]
+        if names[-1] == '__init__':
+            names = names[:-1]
+        return '/'.join(parts[:root]), '.'.join(names)
+
+    def resolve(self, importer: str, specifier: str, names: Iterable[str] = ()) -> List[str]:
+        """
+        Resolve an import found in `importer` to the files it refers to.
+
+        Args:
+            importer (str): Repo-relative path of the importing file
+            specifier (str): Module specifier as written in the import
+            names (Iterable[str]): For Python `from <specifier> import a, b`, the imported
+                names; each is tried as a submodule before falling back to the module itself
+
+        Returns:
+            List[str]: Repo-relative paths of the imported files; empty if none are in the repo
+        """
+        if importer.endswith(PYTHON_EXTENSIONS):
+            resolve = self._resolve_python_relative if specifier.startswith('.') else self._resolve_python_absolute
+            targets = []
+            module_needed = not names
+            for name in names:
+                joined = f"{specifier}{name}" if specifier.endswith('.') else f"{specifier}.{name}"
+                target = resolve(importer, joined)
+                if target:
+                    targets.append(target)
+                else:
+                    # Not a submodule: a name defined in the module (or its __init__.py)
+                    module_needed = True
+            if module_needed:
+                target = resolve(importer, specifier)
+                if target:
+                    targets.append(target)
+            return targets
+
+        if specifier.startswith('.'):
+            target = self._resolve_relative_path(importer, specifier)
+            return [target] if target else []
+        return []
+
+    def _resolve_relative_path(self, importer: str, specifier: str) -> Optional[str]:
+        candidate = posixpath.normpath(posixpath.join(posixpath.dirname(importer), specifier))
+        if candidate.startswith('..'):
+            return None
+        return self._probe(candidate)
+
+    def _probe(self, candidate: str) -> Optional[str]:
+        # Exact file, then extension probing, then directory index files
+        if candidate in self.files:
+            return candidate
+        for ext in JS_EXTENSIONS:
+            if candidate + ext in self.files:
+                return candidate + ext
+        for ext in JS_EXTENSIONS:
+            index_file = f"{candidate}/index{ext}"
+            if index_file in self.files:
+                return index_file
+        return None
+
+    def _resolve_python_relative(self, importer: str, specifier: str) -> Optional[str]:
+        level = len(specifier) - len(specifier.lstrip('.'))
+        base = posixpath.dirname(importer)
+        for _ in range(level - 1):
+            if not base:
+                return None
+            base = posixpath.dirname(base)
+
+        module_path = specifier[level:].replace('.', '/')
+        stem = posixpath.join(base, module_path) if module_path else base
+        for candidate in (f"{stem}.py", f"{stem}.pyi", f"{stem}/__init__.py"):
+            if candidate.lstrip('/') in self.files:
+                return candidate.lstrip('/')
+        return None
+
+    def _resolve_python_absolute(self, importer: str, specifier: str) -> Optional[str]:
+        # Only modules reachable the way Python would find them: under the importer's own
+        # root (its sys.path entry), or in a top-level package the repo defines. A loose
+        # "scripts/json.py" must not capture every `import json` in the repo.
+        importer_root = self._python_roots.get(importer)
+        is_repo_package = specifier.split('.')[0] in self._packages
+        candidates = [
+            path for path in self._python_modules.get(specifier, [])
+            if is_repo_package or self._python_roots[path] == importer_root
+        ]
+        if not candidates:
+            return None
+        if len(candidates) == 1:
+            return candidates[0]
+
+        # Several roots define this module; prefer the one nearest the importer
+        importer_parts = importer.split('/')
+        def shared_prefix(path):
+            count = 0
+            for a, b in zip(importer_parts, path.split('/')):
+                if a != b:
+                    break
+                count += 1
+            return count
+        return max(candidates, key=shared_prefix)
+
+def resolve_import_targets(index: ModuleIndex, importer: str, imports: List[Dict]) -> List[str]:
+    """
+    Resolve one file's imports to repository files, without duplicates or self-references.
+
+    Relative imports are always resolved; Python's absolute dotted imports are
+    resolved too when they name a module under the importer's root or a package the repo defines.
+    """
+    is_python = importer.endswith(PYTHON_EXTENSIONS)
+    targets = []
+    for import_info in imports:
+        if import_info["type"] != "internal" and not is_python:
+            continue
+        for target in index.resolve(importer, import_info["module"], import_info.get("names", ())):
+            if target != importer and target not in targets:
+                targets.append(target)
+    return targets
+
+def resolve_internal_edges(dependencies: Dict, index: ModuleIndex) -> Dict[str, List[str]]:
+    """
+    Resolve every import once, returning {importer: [imported files]}.
+    """
+    return {
+        importer: resolve_import_targets(index, importer, deps["imports"])
+        for importer, deps in dependencies.items()
+    }
@@ -0,0 +1,185 @@
+# services/jobs.py
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+from services.analysis_cache import approximate_size, normalize_repo_url
+
+# Finished jobs kept for status and result lookups; the oldest are dropped first once
+# there are more than JOB_HISTORY of them, their results exceed JOB_HISTORY_BYTES of
+# estimated memory, or they finished more than JOB_MAX_AGE seconds ago
+JOB_HISTORY = int(os.getenv("CODELORE_JOB_HISTORY", "200"))
+JOB_HISTORY_BYTES = int(os.getenv("CODELORE_JOB_HISTORY_BYTES", str(256 * 1024 * 1024)))
+JOB_MAX_AGE = float(os.getenv("CODELORE_JOB_MAX_AGE", str(24 * 3600)))
+
+class Job:
+    """
+    One background analysis run and its progress.
+
+    The pipeline reports each stage through `progress(stage)`; the job records when
+    every stage started and finished so clients can poll which one is running.
+    """
+    def __init__(self, url: str, sha: Optional[str], stages: List[str]):
+        self.id = uuid.uuid4().hex
+        self.url = url
+        self.sha = sha
+        self.stages = stages
+        self.status = "queued"
+        self.current_stage = None
+        self.stage_times = {}
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.result_bytes = 0
+        self.error = None
+        self._lock = threading.Lock()
+
+    def progress(self, stage: str):
+        """
+        Mark `stage` as started and the previous one as finished.
+        """
+        now = time.time()
+        with self._lock:
+            if self.current_stage is not None:
+                self.stage_times[self.current_stage]["finished_at"] = now
+            self.current_stage = stage
+            self.stage_times[stage] = {"started_at": now, "finished_at": None}
+
+    def _start(self):
+        with self._lock:
+            self.status = "running"
+            self.started_at = time.time()
+
+    def _finish(self, status: str, result=None, error: Optional[str] = None):
+        result_bytes = approximate_size(result) if result is not None else 0
+        now = time.time()
+        with self._lock:
+            if self.current_stage is not None and status == "completed":
+                self.stage_times[self.current_stage]["finished_at"] = now
+            self.result = result
+            self.result_bytes = result_bytes
+            self.error = error
+            self.finished_at = now
+            # Last, so _trim never sees a finished status without finished_at
+            self.status = status
+
+    def outcome(self) -> Dict:
+        """
+        Status, current stage, error and result read together, so a completed status
+        is never seen without its result.
+        """
+        with self._lock:
+            return {"status": self.status, "stage": self.current_stage,
+                    "error": self.error, "result": self.result}
+
+    def to_dict(self) -> Dict:
+        """
+        Status view of the job, without its result.
+        """
+        with self._lock:
+            completed = sum(1 for times in self.stage_times.values() if times["finished_at"] is not None)
+            return {
+                "id": self.id,
+                "url": self.url,
+                "sha": self.sha,
+                "status": self.status,
+                "stage": self.current_stage,
+                "progress": {
+                    "completed_stages": completed,
+                    "total_stages": len(self.stages),
+                    "fraction": round(completed / len(self.stages), 3) if self.stages else 0.0
+                },
+                "stages": [
+                    dict(self.stage_times.get(stage, {"started_at": None, "finished_at": None}), name=stage)
+                    for stage in self.stages
+                ],
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "error": self.error
+            }
+
+class JobManager:
+    """
+    Runs analysis pipelines on a bounded background thread pool.
+
+    Submissions are deduplicated on (normalized repo URL, commit SHA): a repeat
+    submission joins the queued, running or completed job for the same snapshot
+    instead of starting another one. Failed jobs are not joined, so a retry reruns.
+    """
+    def __init__(self, max_workers: int, max_history: int = JOB_HISTORY,
+                 max_history_bytes: int = JOB_HISTORY_BYTES, max_age: float = JOB_MAX_AGE):
+        self.max_history = max_history
+        self.max_history_bytes = max_history_bytes
+        self.max_age = max_age
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="codelore-job")
+        self._jobs = OrderedDict()
+        self._by_snapshot = {}
+        self._lock = threading.Lock()
+
+    def submit(self, url: str, sha: Optional[str], pipeline: Callable, stages: List[str]) -> Job:
+        """
+        Queue `pipeline(url, progress)` unless a job for the same snapshot already exists.
+
+        Args:
+            url (str): Repository URL
+            sha (str, optional): Commit the analysis will see; without it, only an
+                active job for the same URL is joined
+            pipeline (Callable): Function of (url, progress) returning the result
+            stages (List[str]): Stage names the pipeline reports, in order
+
+        Returns:
+            Job: The new or joined job
+        """
+        key = (normalize_repo_url(url), sha)
+        with self._lock:
+            existing = self._jobs.get(self._by_snapshot.get(key))
+            if existing is not None and existing.status != "failed":
+                if sha is not None or existing.status in ("queued", "running"):
+                    return existing
+
+            job = Job(url, sha, stages)
+            self._jobs[job.id] = job
+            self._by_snapshot[key] = job.id
+            self._trim()
+
+        self._executor.submit(self._run, job, pipeline)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job: Job, pipeline: Callable):
+        job._start()
+        try:
+            result = pipeline(job.url, job.progress)
+        except Exception as e:
+            print(f"Job {job.id} for {job.url} failed: {e}")
+            job._finish("failed", error=str(e))
+        else:
+            job._finish("completed", result=result)
+        with self._lock:
+            self._trim()
+
+    def _trim(self):
+        # Caller holds the lock; drop the oldest finished jobs beyond the count, size or age limit
+        finished = [job for job in self._jobs.values() if job.status in ("completed", "failed")]
+        remaining = len(finished)
+        total_bytes = sum(job.result_bytes for job in finished)
+        cutoff = time.time() - self.max_age
+        for job in finished:
+            if remaining <= self.max_history and total_bytes <= self.max_history_bytes and job.finished_at >= cutoff:
+                continue
+            remaining -= 1
+            total_bytes -= job.result_bytes
+            del self._jobs[job.id]
+            key = (normalize_repo_url(job.url), job.sha)
+            if self._by_snapshot.get(key) == job.id:
+                del self._by_snapshot[key]
+
+job_manager = JobManager(int(os.getenv("CODELORE_JOB_WORKERS", "2")))
@@ -0,0 +1,234 @@
+# services/local_history.py
+import subprocess
+from typing import Dict, Iterator, List, Optional
+
+# Field/record separators used in --format so commit messages can contain newlines
+RECORD_SEP = "\x1e"
+FIELD_SEP = "\x1f"
+
+# One header token per commit in `git log -z` output
+LOG_FORMAT = f"--format={RECORD_SEP}%H{FIELD_SEP}%an{FIELD_SEP}%aI{FIELD_SEP}%B{FIELD_SEP}"
+
+# git diff status letters mapped to the status names the GitHub API uses
+STATUS_NAMES = {
+    "A": "added",
+    "M": "modified",
+    "D": "removed",
+    "R": "renamed",
+    "C": "copied",
+    "T": "changed",
+    "U": "unmerged",
+}
+
+def run_git(repo_path: str, args: List[str], check: bool = True) -> subprocess.CompletedProcess:
+    """
+    Run a short git command in the repository and capture its text output.
+
+    Args:
+        repo_path (str): Path to the local repository
+        args (List[str]): Arguments passed after `git`
+        check (bool): Raise RuntimeError when git exits non-zero
+
+    Returns:
+        subprocess.CompletedProcess: The finished process with stdout/stderr as text
+    """
+    result = subprocess.run(
+        ["git", "-C", repo_path] + args,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+    )
+    if check and result.returncode != 0:
+        raise RuntimeError(f"git {args[0]} failed: {result.stderr.strip()}")
+    return result
+
+def stream_git_tokens(repo_path: str, args: List[str], chunk_size: int = 1 << 16) -> Iterator[str]:
+    """
+    Run a git command that uses -z output and yield its NUL-separated tokens as they arrive.
+
+    Args:
+        repo_path (str): Path to the local repository
+        args (List[str]): Arguments passed after `git`
+        chunk_size (int): Bytes read from the pipe at a time
+
+    Returns:
+        Iterator[str]: Decoded tokens, in output order
+    """
+    process = subprocess.Popen(
+        ["git", "-C", repo_path] + args,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    try:
+        pending = b""
+        while True:
+            chunk = process.stdout.read(chunk_size)
+            if not chunk:
+                break
+            pending += chunk
+            parts = pending.split(b"\0")
+            pending = parts.pop()
+            for part in parts:
+                yield part.decode("utf-8", errors="replace")
+        if pending:
+            yield pending.decode("utf-8", errors="replace")
+        stderr = process.stderr.read()
+        if process.wait() != 0:
+            raise RuntimeError(f"git {args[0]} failed: {stderr.decode('utf-8', errors='replace').strip()}")
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+        process.stderr.close()
+
+def is_partial_clone(repo_path: str) -> bool:
+    """
+    Check whether the clone was made with a blob filter (history="commits").
+
+    Blobs of such clones are fetched from the remote one at a time on first access, so
+    readers must avoid anything that looks inside files: rename detection and line counts.
+    """
+    result = run_git(repo_path, ["config", "--get", "remote.origin.partialclonefilter"], check=False)
+    return result.returncode == 0 and bool(result.stdout.strip())
+
+def _parse_numstat_count(value: str) -> int:
+    # Binary files report "-" for both counts
+    return int(value) if value.isdigit() else 0
+
+def _parse_commit_header(token: str) -> Dict:
+    fields = token[1:].split(FIELD_SEP)
+    return {
+        "hash": fields[0],
+        "author": fields[1],
+        "date": fields[2],
+        "msg": fields[3].strip(),
+    }
+
+def iter_commit_metadata(repo_path: str, extra_args: Optional[List[str]] = None) -> Iterator[Dict]:
+    """
+    Stream commit metadata and touched paths from a single `git log --name-only` pass.
+
+    Unlike pydriller, this never computes file diffs, so it is the fast path whenever
+    only hashes, messages, authors, dates and file names are needed. On partial clones
+    rename detection is turned off too, as it would fetch blobs; a renamed file then
+    lists both its old and new path.
+
+    Args:
+        repo_path (str): Path to the local repository
+        extra_args (List[str], optional): Extra git log arguments (revision range, `-- path`, ...)
+
+    Returns:
+        Iterator[Dict]: Oldest-first commits with hash, msg, author, date and touched paths
+    """
+    renames = "--no-renames" if is_partial_clone(repo_path) else "-M"
+    args = ["log", "--reverse", "-z", "--name-only", renames, "--no-color", LOG_FORMAT] + (extra_args or [])
+
+    commit = None
+    for token in stream_git_tokens(repo_path, args):
+        token = token.lstrip("\n")
+        if not token:
+            continue
+
+        if token.startswith(RECORD_SEP):
+            if commit is not None:
+                yield commit
+            commit = _parse_commit_header(token)
+            commit["paths"] = []
+        elif commit is not None:
+            commit["paths"].append(token)
+
+    if commit is not None:
+        yield commit
+
+def iter_commit_changes(repo_path: str, extra_args: Optional[List[str]] = None,
+                        oldest_first: bool = True) -> Iterator[Dict]:
+    """
+    Stream commits with per-file status and line counts from a single `git log --raw --numstat` pass.
+
+    Line counts and rename detection need file contents, so on partial clones both are
+    skipped (additions and deletions stay 0, renames show as a removal plus an addition)
+    rather than fetching every blob lazily; callers that need them clone with history="full".
+
+    Args:
+        repo_path (str): Path to the local repository
+        extra_args (List[str], optional): Extra git log arguments (revision range, `-- path`, ...)
+        oldest_first (bool): Pass --reverse; must be False with --follow, which ignores renames under --reverse
+
+    Returns:
+        Iterator[Dict]: Commits (oldest first by default) with hash, msg, author, date and file changes keyed by path
+    """
+    order = ["--reverse"] if oldest_first else []
+    diff_args = ["--no-renames"] if is_partial_clone(repo_path) else ["--numstat", "-M"]
+    args = ["log"] + order + ["-z", "--raw"] + diff_args + ["--no-color", LOG_FORMAT] + (extra_args or [])
+    tokens = stream_git_tokens(repo_path, args)
+
+    commit = None
+    for token in tokens:
+        token = token.lstrip("\n")
+        if not token:
+            continue
+
+        if token.startswith(RECORD_SEP):
+            if commit is not None:
+                yield commit
+            commit = _parse_commit_header(token)
+            commit["files"] = {}
+        elif commit is None:
+            continue
+        elif token.startswith(":"):
+            # Raw line: ":<old mode> <new mode> <old sha> <new sha> <status>" then the path(s)
+            status = token.split()[-1]
+            path = next(tokens)
+            if status[0] in "RC":
+                path = next(tokens)
+            change = commit["files"].setdefault(path, {"filename": path, "additions": 0, "deletions": 0})
+            change["status"] = STATUS_NAMES.get(status[0], "modified")
+        else:
+            # Numstat line: "<added>\t<deleted>\t<path>", or an empty path followed by old and new paths
+            added, deleted, path = token.split("\t", 2)
+            if not path:
+                next(tokens)
+                path = next(tokens)
+            change = commit["files"].setdefault(path, {"filename": path, "status": "modified"})
+            change["additions"] = _parse_numstat_count(added)
+            change["deletions"] = _parse_numstat_count(deleted)
+
+    if commit is not None:
+        yield commit
+
+def get_path_history(repo_path: str, path: str) -> List[Dict]:
+    """
+    Read the history of a single file, following renames, with one `git log --follow` pass.
+
+    Only commits that touched the file are visited, so the cost tracks the length of the
+    file's own history rather than the repository's. --follow detects renames from file
+    contents, so the clone should be a full one: on a partial clone every touched blob
+    would be fetched lazily.
+
+    Args:
+        repo_path (str): Path to the local repository
+        path (str): Repo-relative path of the file at HEAD
+
+    Returns:
+        List[Dict]: Oldest-first changes shaped like ChangeStore.file_history entries,
+        plus `filename`, the file's path as of that commit
+    """
+    history = []
+    # --follow ignores renames when combined with --reverse, so walk newest-first and flip
+    for commit in iter_commit_changes(repo_path, ["--follow", "--", path], oldest_first=False):
+        for filename, change in commit["files"].items():
+            history.append({
+                "commit_sha": commit["hash"],
+                "timestamp": commit["date"],
+                "change_type": change.get("status", "modified"),
+                "additions": change.get("additions", 0),
+                "deletions": change.get("deletions", 0),
+                "summary": commit["msg"],
+                "author": commit["author"],
+                "filename": filename
+            })
+    history.reverse()
+    return history
@@ -1,23 +1,37 @@
 # services/module_parser.py
 import os
+from services.file_index import build_file_index, in_ignored_dir, native_path
 
-def get_directory_tree(base_path, ignore_dirs=None):
+def get_directory_tree(base_path, ignore_dirs=None, file_index=None):
+    """
+    List the files in the repository.
+
+    Args:
+        base_path (str): Path to the local repository
+        ignore_dirs (set, optional): Directory names to leave out. The file index never
+            descends into .git, __pycache__ or node_modules regardless.
+        file_index (list, optional): Shared index from build_file_index, built if not given
+
+    Returns:
+        list: File dictionaries with relative path, type and extension
+    """
     if ignore_dirs is None:
         ignore_dirs = {'.git', '__pycache__', 'node_modules', '.venv'}
+    if file_index is None:
+        file_index = build_file_index(base_path)
 
     structure = []
 
-    for root, dirs, files in os.walk(base_path):
+    for entry in file_index:
         # Filter ignored dirs
-        dirs[:] = [d for d in dirs if d not in ignore_dirs]
-
-        for file in files:
-            rel_path = os.path.relpath(os.path.join(root, file), base_path)
-            structure.append({
-                "path": rel_path,
-                "type": "file",
-                "ext": os.path.splitext(file)[1],
-            })
+        if in_ignored_dir(entry, ignore_dirs):
+            continue
+
+        structure.append({
+            "path": native_path(entry),
+            "type": "file",
+            "ext": entry["ext"],
+        })
 
     return structure
 
@@ -3,10 +3,15 @@ import json
 import re
 from typing import Dict, List, Optional
 from pathlib import Path
+from services.file_index import build_file_index, in_ignored_dir, native_path
 
-def extract_project_summary(repo_path: str) -> Dict:
+# Directories left out of the folder-structure analysis
+EXCLUDED_STRUCTURE_DIRS = {'node_modules', '__pycache__', 'venv'}
+
+def extract_project_summary(repo_path: str, file_index: List[Dict] = None) -> Dict:
     """
     Generate a project summary by analyzing README, package.json, folder structure, and commits.
+    Pass the shared file index to avoid rescanning the repository.
     """
     summary_data = {
         "description": "",
@@ -53,7 +58,7 @@ def extract_project_summary(repo_path: str) -> Dict:
                 pass
     
     # Analyze folder structure
-    structure = analyze_folder_structure(repo_path)
+    structure = analyze_folder_structure(repo_path, file_index)
     summary_data["structure"] = structure
     
     # Infer project type from structure
@@ -65,7 +70,7 @@ def extract_project_summary(repo_path: str) -> Dict:
     
     return summary_data
 
-def analyze_folder_structure(repo_path: str) -> Dict:
+def analyze_folder_structure(repo_path: str, file_index: List[Dict] = None) -> Dict:
     """
     Analyze the folder structure to understand project organization.
     """
@@ -78,36 +83,37 @@ def analyze_folder_structure(repo_path: str) -> Dict:
         "other": []
     }
     
-    for root, dirs, files in os.walk(repo_path):
-        # Skip hidden directories and common exclusions
-        dirs[:] = [d for d in dirs if not d.startswith('.') and d not in ['node_modules', '__pycache__', 'venv']]
+    if file_index is None:
+        file_index = build_file_index(repo_path)
+    
+    for entry in file_index:
+        # Skip hidden directories, common exclusions and top-level files
+        if not entry["dirs"] or in_ignored_dir(entry, EXCLUDED_STRUCTURE_DIRS, skip_hidden=True):
+            continue
         
-        rel_path = os.path.relpath(root, repo_path)
-        if rel_path == '.':
+        file = entry["name"]
+        if file.startswith('.'):
             continue
-            
-        for file in files:
-            if file.startswith('.'):
-                continue
-                
-            file_path = os.path.join(rel_path, file)
-            
-            # Categorize files
-            if any(ext in file.lower() for ext in ['.jsx', '.tsx', '.js', '.ts', '.vue', '.svelte']):
-                if any(folder in rel_path.lower() for folder in ['src', 'app', 'components', 'pages']):
-                    structure["frontend"].append(file_path)
-                else:
-                    structure["backend"].append(file_path)
-            elif any(ext in file.lower() for ext in ['.py', '.java', '.go', '.rb', '.php']):
-                structure["backend"].append(file_path)
-            elif any(ext in file.lower() for ext in ['.json', '.yaml', '.yml', '.toml', '.env']):
-                structure["config"].append(file_path)
-            elif any(ext in file.lower() for ext in ['.md', '.txt', '.rst']):
-                structure["docs"].append(file_path)
-            elif any(ext in file.lower() for ext in ['.test.', '.spec.', 'test_']):
-                structure["tests"].append(file_path)
+        
+        rel_path = os.sep.join(entry["dirs"])
+        file_path = native_path(entry)
+        
+        # Categorize files
+        if any(ext in file.lower() for ext in ['.jsx', '.tsx', '.js', '.ts', '.vue', '.svelte']):
+            if any(folder in rel_path.lower() for folder in ['src', 'app', 'components', 'pages']):
+                structure["frontend"].append(file_path)
             else:
-                structure["other"].append(file_path)
+                structure["backend"].append(file_path)
+        elif any(ext in file.lower() for ext in ['.py', '.java', '.go', '.rb', '.php']):
+            structure["backend"].append(file_path)
+        elif any(ext in file.lower() for ext in ['.json', '.yaml', '.yml', '.toml', '.env']):
+            structure["config"].append(file_path)
+        elif any(ext in file.lower() for ext in ['.md', '.txt', '.rst']):
+            structure["docs"].append(file_path)
+        elif any(ext in file.lower() for ext in ['.test.', '.spec.', 'test_']):
+            structure["tests"].append(file_path)
+        else:
+            structure["other"].append(file_path)
     
     return structure
 
@@ -0,0 +1,62 @@
+# services/records.py
+import sys
+from typing import Dict, Iterable
+
+class CommitRecord:
+    """
+    One commit's metadata, held in slots instead of a dict.
+
+    Author names and file names repeat across thousands of commits, so they are
+    interned and every commit shares one copy. Per-file change records point back
+    at their CommitRecord instead of copying the message and author.
+    """
+    __slots__ = ("hash", "msg", "author", "date", "files")
+
+    def __init__(self, hash: str, msg: str, author: str, date: str, files: Iterable[str] = ()):
+        self.hash = hash
+        self.msg = msg
+        self.author = sys.intern(author)
+        self.date = date
+        self.files = tuple(sys.intern(name) for name in files)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "CommitRecord":
+        return cls(data["hash"], data["msg"], data["author"], data["date"], data.get("files", ()))
+
+    def to_dict(self) -> Dict:
+        """
+        JSON view in the shape get_commit_summary has always returned.
+        """
+        return {
+            "hash": self.hash,
+            "msg": self.msg,
+            "author": self.author,
+            "date": self.date,
+            "files": list(self.files)
+        }
+
+class FileChange:
+    """
+    One file's change in one commit, referencing the shared CommitRecord.
+    """
+    __slots__ = ("commit", "change_type", "additions", "deletions")
+
+    def __init__(self, commit: CommitRecord, change_type: str, additions: int, deletions: int):
+        self.commit = commit
+        self.change_type = sys.intern(change_type)
+        self.additions = additions
+        self.deletions = deletions
+
+    def to_dict(self) -> Dict:
+        """
+        JSON view in the file evolution shape.
+        """
+        return {
+            "commit_sha": self.commit.hash,
+            "timestamp": self.commit.date,
+            "change_type": self.change_type,
+            "additions": self.additions,
+            "deletions": self.deletions,
+            "summary": self.commit.msg,
+            "author": self.commit.author
+        }
@@ -0,0 +1,179 @@
+# services/search_index.py
+import heapq
+import os
+import re
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, List, Optional
+from services.file_analyzer import categorize_file, determine_file_role
+from services.symbol_index import iter_symbols
+
+# Splits names into searchable words: separators and camelCase boundaries
+WORD_BOUNDARY = re.compile(r'[^A-Za-z0-9]+|(?<=[a-z0-9])(?=[A-Z])')
+
+MAX_PAGE_SIZE = 100
+
+def _trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def _words(name: str) -> List[str]:
+    return [word.lower() for word in WORD_BOUNDARY.split(name) if word]
+
+class SearchIndex:
+    """
+    In-memory search over file paths, file roles and symbol names.
+
+    Every file and symbol becomes a document. Two indexes are built once per repo HEAD:
+    - a sorted term list (names, path components and their words, lowercased) for
+      prefix queries via binary search,
+    - trigram posting lists (compact uint32 arrays) over each document's lowercased
+      path or qualified name for substring queries; the rarest trigram of the query
+      picks the candidates, which are then verified with a plain substring check.
+    Role filters match a file's role or category; symbols inherit their file's.
+    """
+    def __init__(self, file_index: List[Dict], symbol_index: Optional[Dict] = None):
+        self.docs = []
+        self._texts = []
+        self._names = []
+        self._role_texts = []
+        self._order_keys = []
+        roles = {}
+
+        for entry in file_index:
+            dir_path = os.path.dirname(entry["path"])
+            role = determine_file_role(entry["name"], dir_path)
+            category = categorize_file(entry["path"], entry["ext"].lower(), dir_path)
+            roles[entry["path"]] = (role, category)
+            self._add({"kind": "file", "name": entry["name"], "path": entry["path"],
+                       "role": role, "category": category}, entry["path"])
+
+        if symbol_index:
+            for symbol in iter_symbols(symbol_index):
+                qualified = f"{symbol['parent']}.{symbol['name']}" if symbol["parent"] else symbol["name"]
+                role, category = roles.get(symbol["file"], ("", ""))
+                self._add({"kind": "symbol", "name": symbol["name"], "qualified_name": qualified,
+                           "type": symbol["type"], "path": symbol["file"], "line": symbol["start_line"],
+                           "role": role, "category": category}, qualified)
+
+        self._build_terms()
+        self._build_trigrams()
+
+    def _add(self, doc: Dict, text: str):
+        self.docs.append(doc)
+        self._texts.append(text.lower())
+        self._names.append(doc["name"].lower())
+        self._role_texts.append(f"{doc['role']}\n{doc['category']}".lower())
+        # Tie-breakers after the match score: shorter paths first, then path and line
+        self._order_keys.append((len(doc["path"]), doc["path"], doc.get("line", 0)))
+
+    def _build_terms(self):
+        pairs = set()
+        for doc_id, doc in enumerate(self.docs):
+            terms = {doc["name"].lower()}
+            terms.update(_words(doc["name"]))
+            if doc["kind"] == "file":
+                for part in doc["path"].split('/')[:-1]:
+                    terms.add(part.lower())
+                    terms.update(_words(part))
+            else:
+                terms.add(doc["qualified_name"].lower())
+            pairs.update((term, doc_id) for term in terms)
+        ordered = sorted(pairs)
+        self._terms = [term for term, _ in ordered]
+        self._term_docs = array('I', (doc_id for _, doc_id in ordered))
+
+    def _build_trigrams(self):
+        postings = defaultdict(list)
+        for doc_id, text in enumerate(self._texts):
+            for trigram in {text[i:i + 3] for i in range(len(text) - 2)}:
+                postings[trigram].append(doc_id)
+        self._trigram_docs = {trigram: array('I', ids) for trigram, ids in postings.items()}
+
+    def _prefix_matches(self, prefix: str) -> set:
+        matches = set()
+        i = bisect_left(self._terms, prefix)
+        while i < len(self._terms) and self._terms[i].startswith(prefix):
+            matches.add(self._term_docs[i])
+            i += 1
+        return matches
+
+    def _substring_matches(self, query: str) -> set:
+        if len(query) < 3:
+            # Too short for trigrams; a scan over the lowercased texts is still cheap
+            return {doc_id for doc_id, text in enumerate(self._texts) if query in text}
+        postings = []
+        for trigram in _trigrams(query):
+            docs = self._trigram_docs.get(trigram)
+            if docs is None:
+                return set()
+            postings.append(docs)
+        rarest = min(postings, key=len)
+        return {doc_id for doc_id in rarest if query in self._texts[doc_id]}
+
+    def _rank(self, doc_id: int, query: str, prefix_hit: bool) -> tuple:
+        name = self._names[doc_id]
+        if name == query:
+            score = 0
+        elif name.startswith(query):
+            score = 1
+        elif prefix_hit:
+            score = 2
+        elif query in name:
+            score = 3
+        else:
+            score = 4
+        return (score,) + self._order_keys[doc_id]
+
+    def search(self, query: str, mode: str = "auto", kind: Optional[str] = None,
+               role: Optional[str] = None, page: int = 1, page_size: int = 20) -> Dict:
+        """
+        Search files and symbols.
+
+        Args:
+            query (str): Text to look for (case-insensitive)
+            mode (str): "prefix" (word/name prefixes), "substring" (anywhere in the
+                path or qualified name) or "auto" (both)
+            kind (str, optional): Restrict to "file" or "symbol" results
+            role (str, optional): Only documents whose file role or category contains this text
+            page (int): 1-based page number
+            page_size (int): Results per page (at most MAX_PAGE_SIZE)
+
+        Returns:
+            Dict: total match count, page info and the ranked results of the requested page
+        """
+        if mode not in ("auto", "prefix", "substring"):
+            raise ValueError(f"Unknown search mode: {mode}")
+        query = query.strip().lower()
+        page = max(1, page)
+        page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+
+        prefix_hits = self._prefix_matches(query) if query and mode != "substring" else set()
+        substring_hits = self._substring_matches(query) if query and mode != "prefix" else set()
+        matches = prefix_hits | substring_hits
+        if not query:
+            matches = set(range(len(self.docs)))
+
+        if kind:
+            matches = {doc_id for doc_id in matches if self.docs[doc_id]["kind"] == kind}
+        if role:
+            role = role.lower()
+            matches = {doc_id for doc_id in matches if role in self._role_texts[doc_id]}
+
+        # Only the requested page and the ones before it need ordering
+        start = (page - 1) * page_size
+        ranked = heapq.nsmallest(start + page_size, matches,
+                                 key=lambda doc_id: self._rank(doc_id, query, doc_id in prefix_hits))
+        return {
+            "query": query,
+            "total": len(matches),
+            "page": page,
+            "page_size": page_size,
+            "results": [self.docs[doc_id] for doc_id in ranked[start:]]
+        }
+
+def build_search_index(file_index: List[Dict], symbol_index: Optional[Dict] = None) -> SearchIndex:
+    """
+    Build the search index for one repo snapshot from its file and symbol indexes.
+    """
+    return SearchIndex(file_index, symbol_index)
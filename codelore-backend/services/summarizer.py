@@ -1,13 +1,106 @@
+import hashlib
 import os
+import random
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
 from dotenv import load_dotenv
 import openai
+from services.disk_cache import DiskCache
 
 # Load environment variables from .env file
 load_dotenv()
 
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
-def summarize_symbol(symbol):
+SUMMARY_MODEL = os.getenv("CODELORE_SUMMARY_MODEL", "gpt-4-turbo")
+
+# Bump whenever a prompt or its generation parameters change, so old summaries are not reused.
+# Single-symbol and batched answers come from different prompts and are versioned apart.
+PROMPT_VERSION = 1
+BATCH_PROMPT_VERSION = 1
+
+# Batching: estimated prompt tokens per request, and symbols per request
+BATCH_TOKEN_BUDGET = int(os.getenv("CODELORE_SUMMARY_BATCH_TOKENS", "3000"))
+MAX_BATCH_SYMBOLS = int(os.getenv("CODELORE_SUMMARY_BATCH_SIZE", "10"))
+
+# Completion requests in flight at once
+SUMMARY_WORKERS = int(os.getenv("CODELORE_SUMMARY_WORKERS", "4"))
+
+MAX_RETRIES = int(os.getenv("CODELORE_SUMMARY_RETRIES", "3"))
+RETRY_BASE_DELAY = float(os.getenv("CODELORE_SUMMARY_RETRY_DELAY", "1.0"))
+
+SUMMARY_MAX_TOKENS = 300
+
+# Transient API failures worth retrying; openai<1 keeps them in openai.error, later
+# versions at the top level under other names (where e.g. openai.Timeout is a config class)
+if hasattr(openai, "error"):
+    _openai_errors = openai.error
+    _retryable_names = ("RateLimitError", "APIError", "Timeout", "APIConnectionError", "ServiceUnavailableError")
+else:
+    _openai_errors = openai
+    _retryable_names = ("RateLimitError", "APITimeoutError", "APIConnectionError", "InternalServerError")
+RETRYABLE_ERRORS = tuple(
+    error for error in (getattr(_openai_errors, name, None) for name in _retryable_names)
+    if isinstance(error, type) and issubclass(error, BaseException)
+)
+
+# Summaries are keyed by what produced them, so unchanged symbols never hit the API twice
+summary_cache = DiskCache("summaries", int(os.getenv("CODELORE_SUMMARY_CACHE_MAX_BYTES", str(256 * 1024 * 1024))))
+
+BATCH_HEADER = re.compile(r'^\s*#{2,}\s*(\d+)\s*$', re.MULTILINE)
+
+def summary_cache_key(symbol, model=SUMMARY_MODEL, batched=False):
+    """
+    Build the cache key for a symbol's summary: model, prompt and its version, and a hash of the code.
+
+    The symbol's type and name are part of the prompt, so they are part of the key too.
+    """
+    code_hash = hashlib.sha256(symbol['code'].encode('utf-8')).hexdigest()
+    prompt = f"b{BATCH_PROMPT_VERSION}" if batched else f"p{PROMPT_VERSION}"
+    return f"{model}:{prompt}:{symbol['type']}:{symbol['name']}:{code_hash}"
+
+def cached_summary(symbol, model=SUMMARY_MODEL):
+    """
+    Look up a symbol's summary from either prompt, counted as a single cache lookup.
+    """
+    return summary_cache.get_any([summary_cache_key(symbol, model), summary_cache_key(symbol, model, batched=True)])
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count for budgeting (about four characters per token for code).
+    """
+    return len(text) // 4 + 1
+
+def _complete(content: str, model: str, max_tokens: int) -> str:
+    """
+    Send one chat completion, retrying transient failures with exponential backoff and jitter.
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            response = openai.ChatCompletion.create(
+                model=model,
+                messages=[{"role": "user", "content": content}],
+                temperature=0.3,
+                max_tokens=max_tokens,
+            )
+            return response['choices'][0]['message']['content'].strip()
+        except RETRYABLE_ERRORS as e:
+            if attempt == MAX_RETRIES:
+                raise
+            delay = RETRY_BASE_DELAY * (2 ** attempt) * (1 + random.random())
+            print(f"Summary request failed ({e}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+def summarize_symbol(symbol, model=SUMMARY_MODEL):
+    cached = cached_summary(symbol, model)
+    if cached is not None:
+        return cached
+    return _request_summary(symbol, model)
+
+def _request_summary(symbol, model: str) -> str:
+    # Ask for one symbol's summary without a cache lookup; the caller already missed
     content = f"""
 You are a code documentation AI. Summarize the following {symbol['type']} named '{symbol['name']}'.
 
@@ -15,11 +108,109 @@ Code:
 {symbol['code']}
 """
 
-    response = openai.ChatCompletion.create(
-        model="gpt-4-turbo",
-        messages=[{"role": "user", "content": content}],
-        temperature=0.3,
-        max_tokens=300,
+    summary = _complete(content, model, SUMMARY_MAX_TOKENS)
+    summary_cache.set(summary_cache_key(symbol, model), summary)
+    return summary
+
+def pack_batches(symbols: List[Dict], token_budget: int = BATCH_TOKEN_BUDGET,
+                 max_symbols: int = MAX_BATCH_SYMBOLS) -> List[List[int]]:
+    """
+    Group symbols into requests whose estimated prompt size stays within token_budget.
+
+    Symbols are packed greedily in order; one that is over budget by itself gets its own request.
+
+    Returns:
+        List[List[int]]: Indices into `symbols`, one list per request
+    """
+    batches = []
+    current, current_tokens = [], 0
+    for i, symbol in enumerate(symbols):
+        tokens = estimate_tokens(symbol['code']) + 20
+        if current and (current_tokens + tokens > token_budget or len(current) >= max_symbols):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+def _batch_prompt(symbols: List[Dict]) -> str:
+    sections = "\n".join(
+        f"### {n}\n{symbol['type']} '{symbol['name']}':\n{symbol['code']}\n"
+        for n, symbol in enumerate(symbols, 1)
     )
+    return f"""
+You are a code documentation AI. Summarize each of the following {len(symbols)} code symbols.
+Answer with one section per symbol, in the same order, each starting with a line
+"### <number>" followed by that symbol's summary. Do not add anything else.
+
+{sections}"""
+
+def split_batch_answer(answer: str, count: int) -> Dict[int, str]:
+    """
+    Split a batched answer into {symbol number (1-based): summary}, skipping empty or unknown sections.
+    """
+    matches = list(BATCH_HEADER.finditer(answer))
+    parts = {}
+    for i, match in enumerate(matches):
+        number = int(match.group(1))
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(answer)
+        text = answer[match.end():end].strip()
+        if 1 <= number <= count and text and number not in parts:
+            parts[number] = text
+    return parts
+
+def _summarize_batch(symbols: List[Dict], model: str) -> List[str]:
+    # Every symbol here already missed the cache in summarize_symbols
+    if len(symbols) == 1:
+        return [_request_summary(symbols[0], model)]
+
+    answer = _complete(_batch_prompt(symbols), model,
+                       min(SUMMARY_MAX_TOKENS * len(symbols), 4096))
+    parts = split_batch_answer(answer, len(symbols))
+
+    summaries = []
+    for n, symbol in enumerate(symbols, 1):
+        if n in parts:
+            summary_cache.set(summary_cache_key(symbol, model, batched=True), parts[n])
+            summaries.append(parts[n])
+        else:
+            # The model skipped or garbled this section; ask for it on its own
+            summaries.append(_request_summary(symbol, model))
+    return summaries
+
+def summarize_symbols(symbols: List[Dict], model: str = SUMMARY_MODEL,
+                      max_workers: int = SUMMARY_WORKERS,
+                      token_budget: int = BATCH_TOKEN_BUDGET) -> List[str]:
+    """
+    Summarize many symbols with as few completion requests as possible.
+
+    Cached summaries are reused; the rest are packed into batches up to token_budget,
+    sent with at most max_workers requests in flight, and the batched answers are
+    split back per symbol.
+
+    Args:
+        symbols (List[Dict]): Symbols with type, name and code
+        model (str): Completion model
+        max_workers (int): Concurrent requests
+        token_budget (int): Estimated prompt tokens per request
+
+    Returns:
+        List[str]: One summary per symbol, in input order
+    """
+    summaries = [cached_summary(symbol, model) for symbol in symbols]
+    pending = [i for i, summary in enumerate(summaries) if summary is None]
+    if not pending:
+        return summaries
 
-    return response['choices'][0]['message']['content'].strip() 
\ No newline at end of file
+    batches = [
+        [pending[i] for i in batch]
+        for batch in pack_batches([symbols[i] for i in pending], token_budget)
+    ]
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(batches)))) as executor:
+        results = executor.map(lambda batch: _summarize_batch([symbols[i] for i in batch], model), batches)
+        for batch, batch_summaries in zip(batches, results):
+            for i, summary in zip(batch, batch_summaries):
+                summaries[i] = summary
+    return summaries
@@ -0,0 +1,171 @@
+# services/symbol_index.py
+import json
+import math
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import repeat
+from typing import Dict, Iterator, List, Optional, Tuple
+from services.blob_cache import ANALYZER_VERSION, blob_cache, get_blob_shas
+from services.code_extractor import extract_symbols_from_source
+from services.dependency_analyzer import DEFAULT_WORKERS, EXCLUDED_CODE_DIRS, PARALLEL_CHUNK_SIZE, PARALLEL_MIN_FILES
+from services.file_index import build_file_index, in_ignored_dir
+
+# Bump when the shape of indexed entries changes so old indexes are rebuilt
+SYMBOL_INDEX_VERSION = 1
+
+PYTHON_SOURCE_EXTENSIONS = ('.py', '.pyi')
+
+def build_symbol_index(repo_path: str, file_index: List[Dict] = None, blob_shas: Dict[str, str] = None,
+                       workers: int = None) -> Dict:
+    """
+    Build the repo-wide index of Python classes and functions.
+
+    The index is persisted next to the commit index and updated incrementally: files
+    whose blob SHA is unchanged keep their entry, blobs parsed before (in any repo) come
+    from the blob cache, and only the remaining files are parsed, across a process pool
+    on large repos.
+
+    Args:
+        repo_path (str): Path to the local repository
+        file_index (List[Dict], optional): Shared file index from build_file_index
+        blob_shas (Dict[str, str], optional): Git blob SHA per path, from get_blob_shas
+        workers (int, optional): Worker processes; <= 1 forces serial mode
+
+    Returns:
+        Dict: {"files": {path: {"blob": sha, "symbols": [...]}}}; every symbol has type,
+        name, start_line, end_line, parent, docstring and code
+    """
+    if file_index is None:
+        file_index = build_file_index(repo_path)
+    if blob_shas is None:
+        blob_shas = get_blob_shas(repo_path)
+
+    python_files = [
+        entry["path"] for entry in file_index
+        if entry["ext"] in PYTHON_SOURCE_EXTENSIONS
+        and not in_ignored_dir(entry, EXCLUDED_CODE_DIRS, skip_hidden=True)
+    ]
+
+    previous = (load_symbol_index(repo_path) or {}).get("files", {})
+    files = {}
+    pending = []
+
+    for path in python_files:
+        blob_sha = blob_shas.get(path)
+        old = previous.get(path)
+        if blob_sha and old and old.get("blob") == blob_sha:
+            files[path] = old
+            continue
+        cached = blob_cache.get("python_symbols", blob_sha) if blob_sha else None
+        if cached is not None:
+            files[path] = {"blob": blob_sha, "symbols": cached}
+        else:
+            pending.append(path)
+
+    for path, symbols in _parse_files(repo_path, pending, workers):
+        blob_sha = blob_shas.get(path)
+        if symbols is None:
+            symbols = []
+        elif blob_sha:
+            blob_cache.set("python_symbols", blob_sha, symbols)
+        files[path] = {"blob": blob_sha, "symbols": symbols}
+
+    # Keep the file index order so listings are stable
+    index = {"files": {path: files[path] for path in python_files}}
+    if pending or set(previous) != set(files):
+        save_symbol_index(repo_path, index)
+    return index
+
+def _parse_file_chunk(repo_path: str, paths: List[str]) -> List[Tuple[str, Optional[List[Dict]]]]:
+    results = []
+    for path in paths:
+        try:
+            with open(os.path.join(repo_path, path), "r", encoding="utf-8") as f:
+                source = f.read()
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"Error reading {path}: {e}")
+            results.append((path, None))
+            continue
+        results.append((path, extract_symbols_from_source(source)))
+    return results
+
+def _parse_files(repo_path: str, paths: List[str], workers: int = None) -> List[Tuple[str, Optional[List[Dict]]]]:
+    workers = DEFAULT_WORKERS if workers is None else workers
+
+    # Pool startup costs more than it saves on small repos
+    if workers <= 1 or len(paths) < PARALLEL_MIN_FILES:
+        return _parse_file_chunk(repo_path, paths)
+
+    chunk_size = max(PARALLEL_CHUNK_SIZE, math.ceil(len(paths) / (workers * 4)))
+    chunks = [paths[i:i + chunk_size] for i in range(0, len(paths), chunk_size)]
+
+    try:
+        results = []
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+            for chunk_results in executor.map(_parse_file_chunk, repeat(repo_path), chunks):
+                results.extend(chunk_results)
+        return results
+    except (OSError, BrokenProcessPool) as e:
+        print(f"Parallel symbol parsing failed, falling back to serial: {e}")
+        return _parse_file_chunk(repo_path, paths)
+
+def file_symbols(index: Dict, path: str) -> Optional[List[Dict]]:
+    """
+    Return the symbols of one indexed file, or None if the file is not in the index.
+    """
+    entry = index["files"].get(path)
+    return entry["symbols"] if entry is not None else None
+
+def iter_symbols(index: Dict) -> Iterator[Dict]:
+    """
+    Yield every indexed symbol as {file, type, name, parent, start_line, end_line, docstring}, without code.
+    """
+    for path, entry in index["files"].items():
+        for symbol in entry["symbols"]:
+            yield {
+                "file": path,
+                "type": symbol["type"],
+                "name": symbol["name"],
+                "parent": symbol.get("parent"),
+                "start_line": symbol["start_line"],
+                "end_line": symbol.get("end_line"),
+                "docstring": symbol.get("docstring")
+            }
+
+def _index_path(repo_path: str) -> str:
+    return os.path.join(repo_path, ".git", "codelore", "symbol_index.json")
+
+def load_symbol_index(repo_path: str) -> Optional[Dict]:
+    """
+    Load the persisted symbol index for a repo, or None if it is missing or outdated.
+    """
+    index_path = _index_path(repo_path)
+    if not os.path.exists(index_path):
+        return None
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable symbol index {index_path}: {e}")
+        return None
+
+    if index.get("version") != SYMBOL_INDEX_VERSION or index.get("analyzer_version") != ANALYZER_VERSION:
+        return None
+    return index
+
+def save_symbol_index(repo_path: str, index: Dict):
+    """
+    Atomically persist the symbol index inside the clone's .git directory.
+    """
+    git_dir = os.path.join(repo_path, ".git")
+    if not os.path.isdir(git_dir):
+        return
+    index_path = _index_path(repo_path)
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    tmp_path = f"{index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"version": SYMBOL_INDEX_VERSION, "analyzer_version": ANALYZER_VERSION,
+                   "files": index["files"]}, f)
+    os.replace(tmp_path, index_path)
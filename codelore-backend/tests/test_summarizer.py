@@ -0,0 +1,98 @@
+import re
+
+import openai
+import pytest
+
+from services import summarizer
+from services.disk_cache import DiskCache
+
+SYMBOLS = [
+    {"type": "function", "name": f"func_{n}", "code": f"def func_{n}():\n    return {n}\n"}
+    for n in range(5)
+]
+
+class StubChatCompletion:
+    """
+    Stand-in for openai.ChatCompletion that records requests and answers batched
+    prompts with one "### n" section per symbol.
+    """
+    def __init__(self, skip_sections=(), failures=0, error=None):
+        self.requests = []
+        self.skip_sections = set(skip_sections)
+        self.failures = failures
+        self.error = error
+
+    def create(self, **request):
+        self.requests.append(request)
+        if self.failures:
+            self.failures -= 1
+            raise self.error
+        prompt = request["messages"][-1]["content"]
+        numbers = [int(n) for n in re.findall(r'^### (\d+)$', prompt, re.MULTILINE)]
+        if numbers:
+            content = "\n".join(f"### {n}\nsummary {n}" for n in numbers if n not in self.skip_sections)
+        else:
+            content = "single summary"
+        return {"choices": [{"message": {"role": "assistant", "content": content}}]}
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = DiskCache("summaries", 1 << 20, root=str(tmp_path))
+    monkeypatch.setattr(summarizer, "summary_cache", cache)
+    return cache
+
+@pytest.fixture
+def stub(monkeypatch):
+    stub = StubChatCompletion()
+    monkeypatch.setattr(openai, "ChatCompletion", stub, raising=False)
+    return stub
+
+def test_repeat_calls_are_served_from_cache(cache, stub):
+    first = summarizer.summarize_symbols(SYMBOLS, model="stub-model", max_workers=1)
+    assert first == [f"summary {n}" for n in range(1, 6)]
+    assert len(stub.requests) == 1
+    assert cache.stats()["hits"] == 0
+    assert cache.stats()["misses"] == len(SYMBOLS)
+
+    second = summarizer.summarize_symbols(SYMBOLS, model="stub-model", max_workers=1)
+    assert second == first
+    assert len(stub.requests) == 1
+    assert cache.stats()["hits"] == len(SYMBOLS)
+    assert cache.stats()["misses"] == len(SYMBOLS)
+
+    assert summarizer.summarize_symbol(SYMBOLS[0], model="stub-model") == "summary 1"
+    assert len(stub.requests) == 1
+
+def test_batch_fallback_counts_one_miss_per_symbol(cache, stub):
+    stub.skip_sections = {2}
+
+    summaries = summarizer.summarize_symbols(SYMBOLS[:3], model="stub-model", max_workers=1)
+    assert summaries == ["summary 1", "single summary", "summary 3"]
+    assert len(stub.requests) == 2
+    assert cache.stats()["misses"] == 3
+    assert cache.stats()["hits"] == 0
+
+def test_batched_and_single_answers_are_versioned_apart(monkeypatch):
+    symbol = SYMBOLS[0]
+    single = summarizer.summary_cache_key(symbol, "m")
+    batched = summarizer.summary_cache_key(symbol, "m", batched=True)
+    assert single != batched
+
+    monkeypatch.setattr(summarizer, "BATCH_PROMPT_VERSION", summarizer.BATCH_PROMPT_VERSION + 1)
+    assert summarizer.summary_cache_key(symbol, "m") == single
+    assert summarizer.summary_cache_key(symbol, "m", batched=True) != batched
+
+def test_retryable_errors_are_exceptions():
+    assert summarizer.RETRYABLE_ERRORS
+    assert all(issubclass(error, BaseException) for error in summarizer.RETRYABLE_ERRORS)
+
+def test_transient_errors_are_retried(stub, monkeypatch):
+    class Transient(Exception):
+        pass
+
+    monkeypatch.setattr(summarizer, "RETRYABLE_ERRORS", (Transient,))
+    monkeypatch.setattr(summarizer, "RETRY_BASE_DELAY", 0)
+    stub.failures, stub.error = 2, Transient("try again")
+
+    assert summarizer._complete("hi", "stub-model", 10) == "single summary"
+    assert len(stub.requests) == 3